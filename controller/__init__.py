@@ -1,9 +1,18 @@
 import _thread
+from array import array
 
 import utime
 
 from parts.base import BasePart
 from logging import getLogger
+from .scheduler import Scheduler, MAX_IDLE, OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_COLLAPSE
+from .hard import HardTier
+from .placement import place
+from .supervisor import Supervisor
+from .memory import Memory, GC_SLACK, GC_THRESHOLD
+from .startup import StartupRunner, After, PHASE_PROBE, PHASE_CONFIG, PHASE_CALIBRATE, PHASE_READY, PHASES
+from . import recording
+from .context import Context, get_context, register as register_context
 
 
 DELAY_FAST = 1000
@@ -12,7 +21,13 @@ DELAY_MEDIUM = 50000
 DELAY_SLOW = 100000
 DELAY_VERY_SLOW = 1000000
 
+# Режими роботи циклів на uasyncio (див. Controller.start)
+ASYNC_NONE = 0
+ASYNC_THREAD0 = 1
+ASYNC_THREAD1 = 2
 
+
+# Реєстри активного контексту (див. context)
 _updates = []
 _startups = []
 _shutdowns = []
@@ -21,25 +36,126 @@ _updates_thread = []
 _startups_thread = []
 _shutdowns_thread = []
 
+_updates_hard = []
+
+_failsafes = []
+
+
+def _bind_context(context):
+    global _updates, _startups, _shutdowns, _updates_thread, _startups_thread, _shutdowns_thread
+    global _updates_hard, _failsafes
+    _updates = context.updates
+    _startups = context.startups
+    _shutdowns = context.shutdowns
+    _updates_thread = context.updates_thread
+    _startups_thread = context.startups_thread
+    _shutdowns_thread = context.shutdowns_thread
+    _updates_hard = context.updates_hard
+    _failsafes = context.failsafes
+
+
+register_context(_bind_context)
+
 
 class Update:
+    """
+    Постійне оновлення.
+    За замовчуванням freq – мінімальна затримка між завершенням виклику та наступним викликом.
+    Якщо fixed_rate=True, виклики йдуть строго кожні freq мкс, а overrun визначає,
+    що робити з тактами, які не встигли виконатися вчасно (див. OVERRUN_*).
+    Якщо hard=True, оновлення виконується жорстким рівнем від апаратного таймера (див. HardTier),
+    thread та fixed_rate при цьому не враховуються. Такий callback може тільки читати Var: запис (Var.set) заборонений.
+    triggers – змінні (Var) або Trigger, після запису (fire) яких оновлення викликається одразу,
+    але не частіше ніж раз на trigger_period мкс; freq тоді – максимальний період між викликами.
+    budget – максимальна тривалість виклику (мкс) для Supervisor, 0 – без обмеження
+    alloc_budget – скільки пам'яті (байт) може виділити один виклик, перевищення рахується у статистиці
+    та один раз пишеться у лог, 0 – без обмеження (див. Controller track_alloc)
+    """
     callback = None
     freq = None
+    name = None
+    thread = None
+    owner = None
+    fixed_rate = False
+    overrun = OVERRUN_SKIP
+    triggers = tuple()
+    trigger_period = 0
+    triggered = False
+    budget = 0
+    alloc_budget = 0
 
-    def __init__(self, callback, freq=DELAY_NORMAL, thread=False):
+    def __init__(
+            self,
+            callback,
+            freq=DELAY_NORMAL,
+            thread=False,
+            name=None,
+            fixed_rate=False,
+            overrun=None,
+            hard=False,
+            owner=None,
+            triggers=tuple(),
+            trigger_period=0,
+            budget=0,
+            alloc_budget=0,
+    ):
         self.callback = callback
         self.freq = freq
-        if thread:
+        self.thread = thread
+        self.owner = owner
+        self.name = name if name else getattr(callback, '__name__', 'update')
+        self.fixed_rate = fixed_rate
+        if overrun is not None:
+            self.overrun = overrun
+        self.triggers = tuple(triggers)
+        self.trigger_period = trigger_period
+        self.budget = budget
+        self.alloc_budget = alloc_budget
+        for var in self.triggers:
+            var.subscribe(self)
+        if hard:
+            _updates_hard.append(self)
+        elif thread:
             _updates_thread.append(self)
         else:
             _updates.append(self)
 
 
+class Trigger:
+    """
+    Запуск оновлень подією замість запису змінної, наприклад перериванням піна:
+    Update(..., triggers=(trigger, )), а обробник переривання викликає trigger.fire().
+    fire() не виділяє пам'ять, тож його можна викликати з жорсткого переривання
+    """
+    def __init__(self):
+        self._targets = []
+
+    def subscribe(self, target):
+        if target not in self._targets:
+            self._targets.append(target)
+
+    def fire(self):
+        targets = self._targets
+        for i in range(len(targets)):
+            targets[i].triggered = True
+
+
 class Startup:
+    """
+    Підготовка перед оновленнями.
+    phase – фаза запуску (див. startup.PHASE_*), startup однієї фази на обох ядрах виконуються одночасно.
+    Замість sleep функція повертає After, щоб не блокувати інші startup
+    """
     function = None
+    thread = None
+    owner = None
+    phase = PHASE_PROBE
 
-    def __init__(self, function, thread=False):
+    def __init__(self, function, thread=False, owner=None, phase=PHASE_PROBE):
         self.function = function
+        self.thread = thread
+        self.owner = owner
+        self.phase = phase
         if thread:
             _startups_thread.append(self)
         else:
@@ -48,21 +164,118 @@ class Startup:
 
 class Shutdown:
     function = None
+    thread = None
+    owner = None
 
-    def __init__(self, function, thread=False):
+    def __init__(self, function, thread=False, owner=None):
         self.function = function
+        self.thread = thread
+        self.owner = owner
         if thread:
             _shutdowns_thread.append(self)
         else:
             _shutdowns.append(self)
 
 
+class Failsafe:
+    """
+    Переведення пристрою у безпечний стан, коли Supervisor виявив збій.
+    Може викликатися з будь-якого ядра, поки інше ядро зависло
+    """
+    function = None
+    owner = None
+
+    def __init__(self, function, owner=None):
+        self.function = function
+        self.owner = owner
+        _failsafes.append(self)
+
+
+class Dependency:
+    """
+    Залежність частини від іншої частини контролера.
+    Оголошується атрибутом класу: `_dashboard = Dependency(Dashboard)`.
+    Під час Controller.start() атрибут екземпляра замінюється на знайдену частину
+    (пошук за типом або будь-яким його базовим класом), або на None, якщо її немає.
+    Якщо required=True, відсутність частини – помилка запуску
+    """
+    type_part = None
+    required = False
+
+    def __init__(self, type_part, required=False):
+        self.type_part = type_part
+        self.required = required
+
+
 class Controller:
     _parts = tuple()
+    last_fault: str = None
+    _registry: dict
     _is_update = False
-    _started_thread0 = False
+    _schedulers: list
+    # Остання завершена фаза запуску кожного ядра (див. startup.StartupRunner)
+    _phases_done: array
+    _startup_runners: list
+    # Startup обох ядер, виконані на thread0 перед прогрівом автоматичного розподілу
+    _placement_runner = None
+    _ready_ms: list
+    _hard_tier: HardTier = None
+    _hard_strict: bool = True
+    _stats_period: int = 0
+    _async_mode: int = ASYNC_NONE
+    _placement_warmup: int = 0
+    _watchdog_timeout: int = 0
+    _supervisor: Supervisor = None
+    _record_file: str = None
+    _replay_file: str = None
+    _context: Context = None
+    _memory: Memory = None
+    _track_alloc: bool = False
 
-    def __init__(self, *parts):
+    def __init__(
+            self,
+            *parts,
+            stats_period=0,
+            hard_strict=True,
+            placement_warmup=0,
+            watchdog_timeout=0,
+            record_file=None,
+            replay_file=None,
+            gc_slack=GC_SLACK,
+            gc_threshold=GC_THRESHOLD,
+            track_alloc=False,
+    ):
+        """
+        stats_period – як часто (мкс) виводити статистику оновлень у лог, 0 – не виводити
+        hard_strict – виконувати жорсткий рівень під heap_lock (див. HardTier)
+        placement_warmup – тривалість (мкс) прогріву, за який вимірюється вартість оновлень
+        для автоматичного розподілу частин між ядрами (див. placement.place), 0 – без розподілу
+        watchdog_timeout – таймаут апаратного watchdog (мс) для Supervisor, 0 – без watchdog.
+        Має бути більшим за 2 * scheduler.MAX_IDLE, бо цикл може простоювати стільки між ітераціями
+        record_file – записувати зовнішні входи у цей файл (див. recording)
+        replay_file – відтворити входи з цього файлу замість реальних, після його закінчення контролер зупиняється
+        gc_slack, gc_threshold – збирання сміття тільки у простої циклів (див. memory.Memory), gc_slack=0 – автоматичне
+        track_alloc – вимірювати виділену пам'ять кожного оновлення (gc.mem_alloc() сам по собі не безкоштовний)
+
+        Контролер працює з реєстрами контексту, активного під час створення (див. context)
+        """
+        self._context = get_context()
+        self._schedulers = [None, None]
+        self._startup_runners = [None, None]
+        self._ready_ms = [0, 0]
+        self._stats_period = stats_period
+        self._hard_strict = hard_strict
+        self._placement_warmup = placement_warmup
+        self._watchdog_timeout = watchdog_timeout
+        self._record_file = record_file
+        self._replay_file = replay_file
+        self._memory = Memory(gc_slack, gc_threshold)
+        self._track_alloc = track_alloc
+        # Оновлення запису та відтворення реєструються один раз, а не при кожному start()
+        if record_file:
+            Update(self._flush_record, DELAY_NORMAL, thread=True, name='record_flush')
+        elif replay_file:
+            Update(self._advance_replay, DELAY_FAST, name='replay')
         parts_ok = []
         types_ok = []
 
@@ -77,62 +290,341 @@ class Controller:
                 raise Exception(f'{type(part)} is not BasePart')
         self._parts = tuple(parts_ok)
 
+        # Частини за типом та за кожним базовим класом (інтерфейсом), перша зареєстрована має перевагу
+        self._registry = {}
+        for part in self._parts:
+            self._register_part(part, type(part))
+
+    def _register_part(self, part, cls):
+        if cls is BasePart or cls is object:
+            return
+        if cls not in self._registry:
+            self._registry[cls] = part
+        for base in cls.__bases__:
+            self._register_part(part, base)
+
     def get_part(self, type_part):
+        """
+        Частина заданого типу або інтерфейсу, None – якщо такої немає
+        """
+        return self._registry.get(type_part)
+
+    def _resolve_dependencies(self):
         for part in self._parts:
-            if type(part) == type_part:
-                return part
-        raise None
+            cls = type(part)
+            for name in dir(cls):
+                dependency = getattr(cls, name)
+                if not isinstance(dependency, Dependency):
+                    continue
+                value = self.get_part(dependency.type_part)
+                if value is None and dependency.required:
+                    raise Exception(f'{cls} requires {dependency.type_part}')
+                setattr(part, name, value)
+
+    def get_stats(self, thread=False):
+        """
+        Статистика виконання оновлень циклу thread0 або thread1 (thread=True)
+        """
+        scheduler = self._schedulers[1 if thread else 0]
+        if scheduler is None:
+            return []
+        return scheduler.stats.get_all()
+
+    def get_hard_stats(self):
+        """
+        Статистика жорсткого рівня, lag – джитер періоду виклику
+        """
+        if self._hard_tier is None:
+            return []
+        return self._hard_tier.stats.get_all()
+
+    def get_boot_report(self):
+        """
+        Час кожного startup (busy – виконання, total – до завершення разом з очікуваннями, мкс)
+        та момент початку оновлень кожного ядра (ready_ms, мс від старту плати)
+        """
+        startups = []
+        runners = ((0, self._placement_runner), (0, self._startup_runners[0]), (1, self._startup_runners[1]))
+        for n, runner in runners:
+            if runner is None:
+                continue
+            for name, phase, busy, total, _ in runner.report:
+                startups.append({'name': name, 'thread': n, 'phase': PHASES[phase], 'busy': busy, 'total': total})
+        return {'startups': startups, 'ready_ms': list(self._ready_ms)}
+
+    def get_memory_stats(self):
+        """
+        Статистика збирання сміття (див. memory.Memory)
+        """
+        return self._memory.get()
+
+    def reset_stats(self):
+        self._memory.reset()
+        for scheduler in self._schedulers:
+            if scheduler is not None:
+                scheduler.stats.reset()
+        if self._hard_tier is not None:
+            self._hard_tier.reset_stats()
+
+    def start(self, async_mode=ASYNC_NONE):
+        """
+        async_mode – який з циклів запустити на uasyncio (ASYNC_THREAD0 або ASYNC_THREAD1).
+        У такому циклі _startup, _update та _shutdown можуть бути async def,
+        звичайні функції теж працюють. uasyncio має один цикл подій, тому асинхронним
+        може бути лише один з двох циклів
+        """
+        if self._is_update:
+            raise Exception('Controller is ready')
+        if async_mode not in (ASYNC_NONE, ASYNC_THREAD0, ASYNC_THREAD1):
+            raise Exception(f'async_mode={async_mode} is not supported')
+        self._context.activate()
+        self._resolve_dependencies()
+        self._async_mode = async_mode
+        self._is_update = True
+        self._phases_done = array('b', [-1, -1])
+        self._placement_runner = None
+        self._hard_tier = HardTier(_updates_hard, getLogger('hard'), self._hard_strict)
+        self._supervisor = Supervisor(self._watchdog_timeout, tuple(_failsafes), getLogger('supervisor'))
+        self.last_fault = self._supervisor.read_fault()
+        if self.last_fault:
+            getLogger('supervisor').warning(f'Last fault: {self.last_fault}')
+
+        if self._record_file:
+            recording.start_record(self._record_file)
+        elif self._replay_file:
+            recording.start_replay(self._replay_file)
 
-    def start(self):
+        groups = ((_startups, _updates, _shutdowns), (_startups_thread, _updates_thread, _shutdowns_thread))
+        if self._placement_warmup:
+            groups = self._auto_placement(groups)
+
+        _thread.start_new_thread(self._start_loop, groups[1] + (True,))
+        self._start_loop(*groups[0])
+
+    def stop(self):
+        self._is_update = False
+
+    def setup(self):
+        """
+        Запуск без власних циклів: startup та оновлення обох груп виконує step(), а завершує teardown().
+        Так один потік по черзі веде багато контролерів (симуляція на хості).
+        Жорсткий рівень працює як звичайні оновлення thread0, запис та відтворення входів не підтримуються
+        """
         if self._is_update:
             raise Exception('Controller is ready')
+        self._context.activate()
+        self._resolve_dependencies()
         self._is_update = True
+        self._phases_done = array('b', [-1, -1])
+        self._supervisor = Supervisor(self._watchdog_timeout, tuple(_failsafes), getLogger('supervisor'))
+        self._startup_runners[0] = StartupRunner(_startups + _startups_thread, self, None, self._phases_done, getLogger('step'))
 
-        _thread.start_new_thread(self._start_loop, (_startups_thread, _updates_thread, _shutdowns_thread, True))
-        self._start_loop(_startups, _updates, _shutdowns)
+    def step(self):
+        """
+        Один прохід: спершу startup (очікування After не блокують інші контролери), далі обидва планувальники.
+        Повертає кількість мкс до наступного виклику
+        """
+        self._context.activate()
+        runner = self._startup_runners[0]
+        if not runner.done:
+            wait = runner.step()
+            if runner.failed:
+                self._is_update = False
+                return MAX_IDLE
+            if wait >= 0:
+                return wait
+            logger = getLogger('step')
+            self._schedulers[0] = Scheduler(_updates + _updates_hard, logger)
+            self._schedulers[1] = Scheduler(_updates_thread, logger)
+            self._supervisor.start()
+            self._ready_ms[0] = self._ready_ms[1] = utime.ticks_ms()
+        wait = MAX_IDLE
+        for scheduler in self._schedulers:
+            wait = min(wait, scheduler.run_pending(self))
+        self._supervise()
+        return wait
+
+    def teardown(self):
+        self._context.activate()
+        self._is_update = False
+        logger = getLogger('step')
+        for shutdown in _shutdowns + _shutdowns_thread:
+            try:
+                shutdown.function(self)
+            except Exception as e:
+                logger.error(f'Error run shutdown: {str(e)}')
+
+    def is_running(self):
+        return self._is_update
+
+    @staticmethod
+    def _flush_record(controller):
+        recording.flush()
+
+    def _advance_replay(self, controller):
+        if not recording.advance():
+            getLogger('recording').info(f"Replay finished")
+            self.stop()
+
+    def _auto_placement(self, groups):
+        """
+        Запускає усі startup на thread0, вимірює вартість усіх оновлень протягом прогріву
+        та розподіляє частини між ядрами. Startup у результаті порожні, бо вже виконані
+        """
+        logger = getLogger('placement')
+        logger.info(f"Run startups...")
+        runner = StartupRunner(list(groups[0][0]) + list(groups[1][0]), self, None, self._phases_done, logger)
+        self._placement_runner = runner
+        while True:
+            wait = runner.step()
+            if wait < 0:
+                break
+            Scheduler.idle(wait)
+        if runner.failed:
+            self._is_update = False
+            return groups
+        runner.log()
+
+        logger.info(f"Warm-up...")
+        updates = list(groups[0][1]) + list(groups[1][1])
+        scheduler = Scheduler(updates, logger)
+        start = utime.ticks_cpu()
+        while self._is_update and utime.ticks_diff(utime.ticks_cpu(), start) < self._placement_warmup:
+            scheduler.idle(scheduler.run_pending(self))
+        window = utime.ticks_diff(utime.ticks_cpu(), start)
+        costs = {}
+        for i, update in enumerate(updates):
+            costs[update] = scheduler.stats.get_time_total(i) / window
+
+        placed = place(groups, costs, logger)
+        return tuple(([], updates, shutdowns) for _, updates, shutdowns in placed)
 
     def _start_loop(self, startups, updates, shutdowns, thread=False):
         logger = getLogger('thread1' if thread else 'thread0')
-        if thread:
-            while not self._started_thread0:
-                utime.sleep(0.01)
         if not self._is_update:
             return
+        if self._async_mode == (ASYNC_THREAD1 if thread else ASYNC_THREAD0):
+            from .async_scheduler import asyncio
+            asyncio.run(self._start_async_loop(startups, updates, shutdowns, logger, thread))
+            return
         logger.info(f"Start loop...")
         logger.info(f"Run startups...")
 
-        for startup in startups:
-            try:
-                startup.function(self)
-            except Exception as e:
-                logger.error(f'Error run startup: {str(e)}')
-                self._is_update = False
-                logger.error(f"Loop closed")
-                return
+        core = 1 if thread else 0
+        runner = StartupRunner(startups, self, core, self._phases_done, logger)
+        self._startup_runners[core] = runner
+        while self._is_update:
+            wait = runner.step()
+            if wait < 0:
+                break
+            Scheduler.idle(wait)
+        if runner.failed or not self._is_update:
+            self._is_update = False
+            logger.error(f"Loop closed")
+            return
+        runner.log()
 
-        functions = tuple([i.callback, i.freq, utime.ticks_cpu()] for i in updates)
+        scheduler = Scheduler(updates, logger, self._track_alloc)
+        self._schedulers[core] = scheduler
+        last_stats = utime.ticks_cpu()
 
-        logger.info(f"Loop started")
         if not thread:
-            self._started_thread0 = True
+            self._hard_tier.start(self)
+            self._supervisor.start()
+            self._memory.start()
+        self._ready_ms[core] = utime.ticks_ms()
+        logger.info(f"Loop started {self._ready_ms[core]}ms after boot")
         while self._is_update:
             try:
-                for f in functions:
-                    if utime.ticks_diff(utime.ticks_cpu(), f[2]) >= f[1]:
-                        try:
-                            f[0](self)
-                        except Exception as e:
-                            logger.error(f'Error run update: {str(e)}')
-                        f[2] = utime.ticks_cpu()
+                wait = scheduler.run_pending(self)
+                self._supervise()
+                if self._stats_period and utime.ticks_diff(utime.ticks_cpu(), last_stats) >= self._stats_period:
+                    scheduler.stats.log(logger)
+                    scheduler.stats.reset()
+                    if not thread:
+                        self._hard_tier.log()
+                        self._hard_tier.reset_stats()
+                        self._memory.log(logger)
+                        self._memory.reset()
+                    last_stats = utime.ticks_cpu()
+                    continue
+                self._memory.idle(wait)
             except (KeyboardInterrupt, SystemExit):
                 break
         logger.info(f"Close Loop...")
 
         self._is_update = False
+        if not thread:
+            self._hard_tier.stop()
+            self._memory.stop()
         logger.info(f"Run shutdowns...")
         for shutdown in shutdowns:
             try:
                 shutdown.function(self)
             except Exception as e:
                 logger.error(f'Error run shutdown: {str(e)}')
+        if not thread:
+            recording.stop()
         logger.info(f"Loop closed")
+
+    async def _start_async_loop(self, startups, updates, shutdowns, logger, thread):
+        from .async_scheduler import AsyncScheduler, asyncio, call
+        logger.info(f"Start async loop...")
+        logger.info(f"Run startups...")
+
+        core = 1 if thread else 0
+        runner = StartupRunner(startups, self, core, self._phases_done, logger, allow_async=True)
+        self._startup_runners[core] = runner
+        while self._is_update:
+            wait = runner.step()
+            for awaitable in runner.take_awaitables():
+                try:
+                    await awaitable
+                except Exception as e:
+                    logger.error(f'Error run startup: {str(e)}')
+                    runner.failed = True
+            if wait < 0 or runner.failed:
+                break
+            # Вгору до цілої мс, як в AsyncScheduler: sleep_ms(0) крутився б без простою
+            await asyncio.sleep_ms((wait + 999) // 1000)
+        if runner.failed or not self._is_update:
+            self._is_update = False
+            logger.error(f"Loop closed")
+            return
+        runner.log()
+
+        scheduler = AsyncScheduler(updates, logger, self._track_alloc)
+        self._schedulers[core] = scheduler
+
+        if not thread:
+            self._hard_tier.start(self)
+            self._supervisor.start()
+            self._memory.start()
+        self._ready_ms[core] = utime.ticks_ms()
+        logger.info(f"Loop started {self._ready_ms[core]}ms after boot")
+        try:
+            await scheduler.run(self, self.is_running, self._async_idle)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        logger.info(f"Close Loop...")
+
+        self._is_update = False
+        if not thread:
+            self._hard_tier.stop()
+            self._memory.stop()
+        logger.info(f"Run shutdowns...")
+        for shutdown in shutdowns:
+            try:
+                await call(shutdown.function, self)
+            except Exception as e:
+                logger.error(f'Error run shutdown: {str(e)}')
+        if not thread:
+            recording.stop()
+        logger.info(f"Loop closed")
+
+    def _supervise(self):
+        self._supervisor.check(self, self._schedulers)
+
+    def _async_idle(self):
+        self._supervise()
+        self._memory.check()
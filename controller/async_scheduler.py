@@ -0,0 +1,121 @@
+import gc
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import utime
+
+from .scheduler import Scheduler, MAX_IDLE, TRIGGER_IDLE
+from .stats import UpdateStats
+
+
+async def call(function, controller):
+    """
+    Виклик startup/update/shutdown у асинхронному режимі.
+    Звичайні функції просто викликаються, для async def результат очікується
+    """
+    result = function(controller)
+    if result is not None and hasattr(result, 'send'):
+        await result
+
+
+class AsyncScheduler:
+    """
+    Планувальник оновлень одного циклу на uasyncio.
+    Кожне оновлення – окрема задача, тож оновлення з async def _update
+    можуть очікувати (await) і віддавати ядро іншим оновленням
+    """
+    _updates: tuple
+
+    stats: UpdateStats
+
+    heartbeat: int = 0
+    fault: int = -1
+
+    def __init__(self, updates, logger, track_alloc=False):
+        self._updates = tuple(updates)
+        self._logger = logger
+        self._track_alloc = track_alloc
+        self.stats = UpdateStats([i.name for i in self._updates], [i.freq for i in self._updates])
+        self.heartbeat = utime.ticks_cpu()
+
+    async def run(self, controller, is_running, on_idle=None):
+        """
+        Працює, поки is_running() повертає True.
+        on_idle() викликається між оновленнями не рідше ніж раз на MAX_IDLE
+        """
+        tasks = [asyncio.create_task(self._run_update(i, controller, is_running)) for i in range(len(self._updates))]
+        while is_running():
+            self.heartbeat = utime.ticks_cpu()
+            if on_idle is not None:
+                on_idle()
+            await asyncio.sleep_ms(MAX_IDLE // 1000)
+        for task in tasks:
+            task.cancel()
+
+    async def _run_update(self, i, controller, is_running):
+        update = self._updates[i]
+        due = utime.ticks_cpu()
+        last_start = due
+        # Для fixed_rate: такт сітки, з якого виклик перенесено тригером раніше
+        grid = None
+        while is_running():
+            # Навіть без очікування задача віддає керування іншим
+            await asyncio.sleep_ms(0)
+            now = utime.ticks_cpu()
+            if update.triggered:
+                update.triggered = False
+                triggered_due = utime.ticks_add(last_start, update.trigger_period)
+                if utime.ticks_diff(triggered_due, due) < 0:
+                    if update.fixed_rate and grid is None:
+                        grid = due
+                    due = triggered_due
+            wait = utime.ticks_diff(due, now)
+            if wait > 0:
+                # Оновлення з triggers прокидаються частіше, щоб помітити запис змінної
+                if update.triggers and wait > TRIGGER_IDLE:
+                    wait = TRIGGER_IDLE
+                # Вгору до цілої мс: sleep_ms(0) лише віддає керування, і цикл подій крутився б без простою
+                await asyncio.sleep_ms((wait + 999) // 1000)
+                continue
+            start = utime.ticks_cpu()
+            last_start = start
+            # Якщо оновлення чекає (await), у вимір потрапляють і виділення інших задач
+            measure = self._track_alloc or update.alloc_budget
+            if measure:
+                alloc = gc.mem_alloc()
+            try:
+                await call(update.callback, controller)
+            except Exception as e:
+                self._logger.error(f'Error run update {update.name}: {str(e)}')
+            if measure:
+                Scheduler._record_alloc(self.stats, self._logger, update, i, gc.mem_alloc() - alloc)
+            end = utime.ticks_diff(utime.ticks_cpu(), start)
+            if update.budget and end > update.budget:
+                self.fault = i
+            lag = utime.ticks_diff(start, due)
+            try:
+                self.stats.record(i, lag, end)
+            except Exception as e:
+                self._logger.error(f'Error record stats {update.name}: {str(e)}')
+            # Час рахується відносно початку виклику, щоб не виходити за межі ticks_diff
+            if grid is not None:
+                # Виклик за тригером поза сіткою: сітка fixed_rate не зсувається
+                grid_due = utime.ticks_diff(grid, start)
+                grid = None
+                due = utime.ticks_add(start, grid_due if grid_due > end else Scheduler._next_due(update, grid_due, 0, end))
+            else:
+                due = utime.ticks_add(start, Scheduler._next_due(update, -lag, 0, end))
+
+    def get_fault(self, now, loop_budget):
+        """
+        Опис порушення або None (див. Scheduler.get_fault).
+        Зависання окремого callback-а тут видно як зупинку всього циклу подій
+        """
+        if self.fault >= 0:
+            return f'{self._updates[self.fault].name} exceeded budget'
+        if loop_budget and utime.ticks_diff(now, self.heartbeat) > loop_budget:
+            return 'loop stalled'
+        return None
@@ -0,0 +1,82 @@
+"""
+Контекст контролера – усі реєстри однієї моделі: оновлення, startup, shutdown, failsafe
+та дані інших пакетів (значення змінних global_vars тощо).
+
+Реєстри залишаються глобальними змінними модулів, тож гарячий шлях не змінюється:
+при активації контексту кожен зареєстрований модуль переключає свої глобальні змінні
+на дані цього контексту (див. register). За замовчуванням активний DEFAULT,
+тому програма з одним контролером працює як раніше.
+
+Кілька моделей в одному процесі:
+
+    with Context() as context:
+        car = Controller(Turn(ServoSG90(Pin(29))))
+
+Частини, створені всередині with, реєструються у своєму контексті, Controller запам'ятовує контекст,
+у якому створений, і активує його на час роботи. Активний контекст один на процес,
+тому кілька контролерів в одному процесі працюють по черзі через Controller.step(), а не start()
+"""
+_binders = []
+
+
+class Context:
+    updates: list
+    startups: list
+    shutdowns: list
+    updates_thread: list
+    startups_thread: list
+    shutdowns_thread: list
+    updates_hard: list
+    failsafes: list
+    # Дані інших пакетів за назвою пакета
+    data: dict
+
+    def __init__(self):
+        self.updates = []
+        self.startups = []
+        self.shutdowns = []
+        self.updates_thread = []
+        self.startups_thread = []
+        self.shutdowns_thread = []
+        self.updates_hard = []
+        self.failsafes = []
+        self.data = {}
+        self._previous = None
+
+    def activate(self):
+        """
+        Робить контекст активним, повертає попередній
+        """
+        global _current
+        previous = _current
+        if self is not previous:
+            _current = self
+            for bind in _binders:
+                bind(self)
+        return previous
+
+    def __enter__(self):
+        self._previous = self.activate()
+        return self
+
+    def __exit__(self, *exc):
+        self._previous.activate()
+        self._previous = None
+        return False
+
+
+DEFAULT = Context()
+_current = DEFAULT
+
+
+def get_context():
+    return _current
+
+
+def register(bind):
+    """
+    bind(context) переключає глобальні реєстри модуля на дані context.
+    Викликається одразу для активного контексту і далі при кожній активації
+    """
+    _binders.append(bind)
+    bind(_current)
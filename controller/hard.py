@@ -0,0 +1,147 @@
+from array import array
+import _thread
+
+import micropython
+import utime
+from machine import Timer
+
+from .stats import UpdateStats
+
+
+micropython.alloc_emergency_exception_buf(100)
+
+# Ідентифікатор потоку, у якому зараз виконуються callback-и жорсткого рівня, інакше None.
+# global_vars не дозволяє запис змінних тільки з цього потоку: інше ядро пише як завжди
+running = [None]
+
+
+class HardTier:
+    """
+    Жорсткий рівень оновлень.
+    Апаратний таймер через micropython.schedule викликає оновлення з періодом,
+    кратним найменшому freq серед них, незалежно від того, чим зайнятий звичайний цикл.
+
+    Правила для callback-ів цього рівня: не виділяти пам'ять (без f-рядків, списків,
+    float-арифметики там, де float не вбудований), не блокувати і не звертатися до файлів.
+    Змінні Var тут тільки читаються: запис може перервати запис на тому ж ядрі посередині,
+    тому Var.set з цього рівня закінчується RuntimeError (рахується у errors).
+    У strict-режимі виклики йдуть під micropython.heap_lock(), тож виділення пам'яті
+    закінчується MemoryError, який рахується у alloc_errors
+    """
+    stats: UpdateStats
+
+    def __init__(self, updates, logger, strict=True):
+        self._updates = tuple(updates)
+        self._logger = logger
+        self._strict = strict
+        count = len(self._updates)
+        self._period = min(i.freq for i in self._updates) if count else 0
+        self._dividers = array('L', [max(1, (i.freq + self._period // 2) // self._period) for i in self._updates])
+        self._counters = array('L', [0] * count)
+        self._starts = array('l', [0] * count)
+        self._prev_starts = array('l', [0] * count)
+        self._durations = array('l', [0] * count)
+        # Чи викликалось оновлення у поточному такті та чи відомий час попереднього виклику
+        self._ran = bytearray(count)
+        self._seen = bytearray(count)
+        self.alloc_errors = array('L', [0] * count)
+        self.errors = array('L', [0] * count)
+        self.overruns = 0
+        # Такти, які не вдалося запланувати: черга micropython.schedule заповнена
+        self.schedule_errors = 0
+        self.stats = UpdateStats([i.name for i in self._updates], [i.freq for i in self._updates])
+        self._controller = None
+        self._timer = None
+        self._pending = False
+        # Посилання на bound-методи створюються один раз, бо у перериванні виділяти пам'ять не можна
+        self._run_ref = self._run
+        self._irq_ref = self._irq
+
+    def start(self, controller):
+        if not self._updates:
+            return
+        self._controller = controller
+        self._timer = Timer()
+        self._timer.init(mode=Timer.PERIODIC, freq=1000000 // self._period, callback=self._irq_ref)
+        self._logger.info(f"Hard tier started, period={self._period}us")
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _irq(self, timer):
+        if self._pending:
+            # Попередній такт ще не виконано – цей пропускається
+            self.overruns += 1
+            return
+        self._pending = True
+        try:
+            micropython.schedule(self._run_ref, 0)
+        except RuntimeError:
+            # Такт пропущено: рахується як missed кожного оновлення
+            self._pending = False
+            self.schedule_errors += 1
+            missed = self.stats.missed
+            for i in range(len(missed)):
+                missed[i] += 1
+
+    def _run(self, _):
+        controller = self._controller
+        updates = self._updates
+        counters = self._counters
+        ran = self._ran
+        # До heap_lock: get_ident() може виділити пам'ять
+        running[0] = _thread.get_ident()
+        if self._strict:
+            micropython.heap_lock()
+        try:
+            for i in range(len(updates)):
+                counters[i] += 1
+                if counters[i] < self._dividers[i]:
+                    continue
+                counters[i] = 0
+                start = utime.ticks_cpu()
+                try:
+                    updates[i].callback(controller)
+                except MemoryError:
+                    self.alloc_errors[i] += 1
+                except Exception:
+                    self.errors[i] += 1
+                self._durations[i] = utime.ticks_diff(utime.ticks_cpu(), start)
+                self._starts[i] = start
+                ran[i] = 1
+        finally:
+            running[0] = None
+            if self._strict:
+                micropython.heap_unlock()
+            self._pending = False
+        # Статистика пишеться вже без heap_lock
+        for i in range(len(updates)):
+            if not ran[i]:
+                continue
+            ran[i] = 0
+            start = self._starts[i]
+            if self._seen[i]:
+                # Відхилення фактичного періоду від заданого (джитер)
+                jitter = utime.ticks_diff(start, self._prev_starts[i]) - updates[i].freq
+                self.stats.record(i, jitter if jitter >= 0 else -jitter, self._durations[i])
+            self._seen[i] = 1
+            self._prev_starts[i] = start
+
+    def log(self):
+        self.stats.log(self._logger)
+        for i in range(len(self._updates)):
+            if self.alloc_errors[i] or self.errors[i]:
+                self._logger.warning(
+                    f"{self._updates[i].name}: alloc_errors={self.alloc_errors[i]} errors={self.errors[i]}"
+                )
+        self._logger.info(f"Hard tier overruns={self.overruns} schedule_errors={self.schedule_errors}")
+
+    def reset_stats(self):
+        self.stats.reset()
+        for i in range(len(self._updates)):
+            self.alloc_errors[i] = 0
+            self.errors[i] = 0
+        self.overruns = 0
+        self.schedule_errors = 0
@@ -0,0 +1,125 @@
+import gc
+import _thread
+
+import utime
+
+from .scheduler import Scheduler
+
+
+# Мінімальний простій (мкс), у який вміщується gc.collect()
+GC_SLACK = 3000
+# Скільки байт має бути виділено з останнього збирання, щоб збирати у простої
+GC_THRESHOLD = 8192
+# Якщо вільної пам'яті менше (байт) – збирати одразу, не чекаючи простою
+GC_LOW_FREE = 16384
+# Як часто (мкс) перевіряти вільну пам'ять, коли простою не вистачає: gc.mem_free() проходить усю купу
+GC_CHECK_PERIOD = 50000
+
+
+class Memory:
+    """
+    Збирання сміття тільки у простої циклів.
+    Автоматичне збирання вимкнене, поки працюють цикли, тож воно не зупинить оновлення посередині виклику.
+    gc.collect() виконується, коли до наступного оновлення лишається щонайменше slack мкс
+    і з минулого збирання виділено threshold байт.
+    При вимкненому автоматичному збиранні MicroPython не збирає сміття і при нестачі пам'яті,
+    тому, якщо вільної пам'яті менше low_free, збирання виконується одразу.
+    Купа спільна для обох ядер: збирає те ядро, яке першим має достатній простій
+    """
+    collections: int = 0
+    emergency: int = 0
+    collect_time_max: int = 0
+    collect_time_total: int = 0
+
+    def __init__(self, slack=GC_SLACK, threshold=GC_THRESHOLD, low_free=GC_LOW_FREE):
+        """
+        slack – 0: не керувати збиранням, працює автоматичне
+        """
+        self._slack = slack
+        self._threshold = threshold
+        self._low_free = low_free
+        self._lock = _thread.allocate_lock()
+        self._heap_size = 0
+        self._alloc_after = 0
+        self._last_check = utime.ticks_cpu()
+
+    def start(self):
+        if not self._slack:
+            return
+        gc.collect()
+        self._heap_size = gc.mem_alloc() + gc.mem_free()
+        self._alloc_after = gc.mem_alloc()
+        gc.disable()
+
+    def stop(self):
+        if self._heap_size:
+            self._heap_size = 0
+            gc.enable()
+
+    def idle(self, wait):
+        """
+        Замість Scheduler.idle: спершу збирання сміття, якщо воно потрібне і вміщується, далі простій.
+        Нестача пам'яті перевіряється і без простою (перевантажений цикл), не частіше за GC_CHECK_PERIOD
+        """
+        if self._heap_size:
+            now = utime.ticks_cpu()
+            has_slack = wait >= self._slack
+            if has_slack or utime.ticks_diff(now, self._last_check) >= GC_CHECK_PERIOD:
+                self._last_check = now
+                self._collect(has_slack)
+                wait -= utime.ticks_diff(utime.ticks_cpu(), now)
+        Scheduler.idle(wait)
+
+    def check(self):
+        """
+        Тільки збирання при нестачі пам'яті (цикл на uasyncio, де простій невідомий)
+        """
+        if not self._heap_size:
+            return
+        now = utime.ticks_cpu()
+        if utime.ticks_diff(now, self._last_check) >= GC_CHECK_PERIOD:
+            self._last_check = now
+            self._collect(False)
+
+    def _collect(self, has_slack):
+        if not self._lock.acquire(0):
+            # Інше ядро вже збирає
+            return
+        try:
+            free = gc.mem_free()
+            if free < self._low_free:
+                self.emergency += 1
+            elif not has_slack or self._heap_size - free - self._alloc_after < self._threshold:
+                return
+            start = utime.ticks_cpu()
+            gc.collect()
+            duration = utime.ticks_diff(utime.ticks_cpu(), start)
+            self.collections += 1
+            self.collect_time_total += duration
+            if duration > self.collect_time_max:
+                self.collect_time_max = duration
+            self._alloc_after = self._heap_size - gc.mem_free()
+        finally:
+            self._lock.release()
+
+    def get(self):
+        return {
+            'collections': self.collections,
+            'emergency': self.emergency,
+            'collect_time_max': self.collect_time_max,
+            'collect_time_mean': self.collect_time_total // self.collections if self.collections else 0,
+            'mem_free': gc.mem_free(),
+        }
+
+    def reset(self):
+        self.collections = 0
+        self.emergency = 0
+        self.collect_time_max = 0
+        self.collect_time_total = 0
+
+    def log(self, logger):
+        s = self.get()
+        logger.info(
+            f"GC collections={s['collections']} emergency={s['emergency']} "
+            f"time={s['collect_time_mean']}/{s['collect_time_max']}us mem_free={s['mem_free']}"
+        )
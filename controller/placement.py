@@ -0,0 +1,78 @@
+def _unit_key(entry):
+    owner = entry.owner
+    if owner is None:
+        return entry
+    group = getattr(owner, 'core_group', None)
+    return owner if group is None else group
+
+
+def _unit_pin(entry):
+    if entry.owner is None:
+        return bool(entry.thread)
+    return entry.owner.thread
+
+
+def _unit_name(key):
+    if isinstance(key, str):
+        return f'group {key}'
+    if hasattr(key, 'callback'):
+        return key.name
+    if hasattr(key, 'function'):
+        return getattr(key.function, '__name__', type(key).__name__)
+    return type(key).__name__
+
+
+def place(groups, costs, logger):
+    """
+    Розподіляє startup, оновлення та shutdown між ядрами.
+    Частини з однаковим core_group завжди потрапляють на одне ядро,
+    thread=True/False у частини – явне закріплення за ядром, thread=None – вільне розміщення.
+
+    groups – ((startups0, updates0, shutdowns0), (startups1, updates1, shutdowns1))
+    costs – словник Update -> частка часу ядра, виміряна під час прогріву.
+    Повертає groups у тому ж форматі
+    """
+    units = {}
+    for group in groups:
+        for entries in group:
+            for entry in entries:
+                key = _unit_key(entry)
+                pin = _unit_pin(entry)
+                unit = units.get(key)
+                if unit is None:
+                    units[key] = [pin, costs.get(entry, 0)]
+                    continue
+                if unit[0] is None:
+                    unit[0] = pin
+                elif pin is not None and bool(pin) != bool(unit[0]):
+                    logger.warning(f'{_unit_name(key)}: conflicting thread pins, keep thread={unit[0]}')
+                unit[1] += costs.get(entry, 0)
+
+    loads = [0, 0]
+    cores = {}
+    free = []
+    for key in units:
+        pin, cost = units[key]
+        if pin is None:
+            free.append(key)
+        else:
+            core = 1 if pin else 0
+            cores[key] = core
+            loads[core] += cost
+    # Найдорожчі частини першими – на найменш завантажене ядро
+    free.sort(key=lambda k: units[k][1], reverse=True)
+    for key in free:
+        core = 0 if loads[0] <= loads[1] else 1
+        cores[key] = core
+        loads[core] += units[key][1]
+
+    for key in units:
+        logger.info(f"{_unit_name(key):<40} thread{cores[key]} {units[key][1] * 100:.1f}%")
+    logger.info(f"Load thread0={loads[0] * 100:.1f}% thread1={loads[1] * 100:.1f}%")
+
+    result = (([], [], []), ([], [], []))
+    for group in groups:
+        for n, entries in enumerate(group):
+            for entry in entries:
+                result[cores[_unit_key(entry)]][n].append(entry)
+    return result
@@ -0,0 +1,241 @@
+"""
+Запис та відтворення зовнішніх входів контролера (радіопакети, енкодери, гіроскоп, АЦП).
+
+Драйвери читають входи через Input:
+- Input.filter(value) для станів (значення датчика): у режимі запису значення пишеться у файл,
+  у режимі відтворення замість нього повертається записане;
+- Input.event(data) / Input.take() для подій (радіопакети).
+
+Файл: заголовок FILE_HEADER, далі записи RECORD_FORMAT (час від початку запису в мкс,
+канал, номер джерела в каналі, довжина даних) та самі дані
+"""
+import struct
+import _thread
+
+import utime
+
+
+MODE_OFF = 0
+MODE_RECORD = 1
+MODE_REPLAY = 2
+
+INPUT_RADIO = 1
+INPUT_ENCODER = 2
+INPUT_DIRECTION = 3
+INPUT_GYRO = 4
+INPUT_ACCEL = 5
+INPUT_ADC = 6
+
+FILE_HEADER = b'FREC\x01'
+RECORD_FORMAT = '<IBBB'
+RECORD_SIZE = 7
+# Буфер запису (байт): його вміст пише у файл flush() з оновлення на thread1
+RECORD_BUFFER = 4096
+
+_mode = MODE_OFF
+_recorder = None
+_player = None
+# channel << 8 | source -> Input
+_inputs = {}
+
+
+class Input:
+    """
+    Один зовнішній вхід.
+    fmt – формат struct для значення, None – сирі байти (події)
+    """
+    channel: int
+    source: int
+    fmt: str
+    value = None
+
+    def __init__(self, channel, fmt=None):
+        self.channel = channel
+        self.fmt = fmt
+        self.source = 0
+        while channel << 8 | self.source in _inputs:
+            self.source += 1
+        _inputs[channel << 8 | self.source] = self
+        self._events = []
+
+    def filter(self, value):
+        if _mode == MODE_RECORD:
+            _recorder.write(self, struct.pack(self.fmt, value))
+        elif _mode == MODE_REPLAY and self.value is not None:
+            return self.value
+        return value
+
+    def event(self, data):
+        if _mode == MODE_RECORD and data:
+            _recorder.write(self, data)
+        return data
+
+    def take(self):
+        """
+        Наступна відтворена подія або None
+        """
+        if self._events:
+            return self._events.pop(0)
+        return None
+
+
+class _Clock:
+    # Час у мкс від старту без обмежень ticks_diff, поки між викликами проходить менше ~9 хв
+    def __init__(self):
+        self._last = utime.ticks_cpu()
+        self.elapsed = 0
+
+    def update(self):
+        now = utime.ticks_cpu()
+        self.elapsed += utime.ticks_diff(now, self._last)
+        self._last = now
+        return self.elapsed
+
+
+class Recorder:
+    """
+    Входи пишуться у буфер, а у файл його переносить flush() поза гарячим шляхом (два буфери по черзі).
+    Якщо flush() не встигає і буфер заповнився, запис у файл робить сам write (рахується в overflows)
+    """
+    def __init__(self, filename, buffer_size=RECORD_BUFFER):
+        self._file = open(filename, 'wb')
+        self._file.write(FILE_HEADER)
+        self._buffer = bytearray(buffer_size)
+        self._spare = bytearray(buffer_size)
+        self._length = 0
+        self._clock = _Clock()
+        self.overflows = 0
+        # Входи пишуть обидва ядра
+        self._lock = _thread.allocate_lock()
+        # Порядок записів у файл: береться під _lock, тож буфери потрапляють у файл у порядку заповнення
+        self._file_lock = _thread.allocate_lock()
+
+    def write(self, channel_input, data):
+        with self._lock:
+            size = RECORD_SIZE + len(data)
+            if self._length + size > len(self._buffer):
+                self.overflows += 1
+                with self._file_lock:
+                    self._file.write(memoryview(self._buffer)[:self._length])
+                self._length = 0
+            struct.pack_into(
+                RECORD_FORMAT, self._buffer, self._length,
+                self._clock.update(), channel_input.channel, channel_input.source, len(data),
+            )
+            self._buffer[self._length + RECORD_SIZE:self._length + size] = data
+            self._length += size
+
+    def flush(self):
+        """
+        Переносить записане у файл. Буфери міняються місцями під _lock, а сам запис у файл іде вже без нього
+        """
+        self._lock.acquire()
+        if not self._length:
+            self._lock.release()
+            return
+        buffer, length = self._buffer, self._length
+        self._buffer, self._spare = self._spare, buffer
+        self._length = 0
+        self._file_lock.acquire()
+        self._lock.release()
+        try:
+            self._file.write(memoryview(buffer)[:length])
+        finally:
+            self._file_lock.release()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            with self._file_lock:
+                if self._length:
+                    self._file.write(memoryview(self._buffer)[:self._length])
+                    self._length = 0
+                self._file.close()
+
+
+class Player:
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        if self._file.read(len(FILE_HEADER)) != FILE_HEADER:
+            raise Exception(f'{filename} is not a recording')
+        self._clock = _Clock()
+        self._next = None
+        self.finished = False
+        self._read_next()
+
+    def advance(self):
+        """
+        Подає на входи всі записи, час яких настав.
+        Повертає False, коли записи закінчились і всі події забрані
+        """
+        elapsed = self._clock.update()
+        while self._next is not None and self._next[0] <= elapsed:
+            _, channel, source, data = self._next
+            channel_input = _inputs.get(channel << 8 | source)
+            if channel_input is not None:
+                if channel_input.fmt is None:
+                    channel_input._events.append(data)
+                else:
+                    channel_input.value = struct.unpack(channel_input.fmt, data)[0]
+            self._read_next()
+        if not self.finished:
+            return True
+        for channel_input in _inputs.values():
+            if channel_input._events:
+                return True
+        return False
+
+    def close(self):
+        self._file.close()
+
+    def _read_next(self):
+        header = self._file.read(RECORD_SIZE)
+        if len(header) < RECORD_SIZE:
+            self._next = None
+            self.finished = True
+            return
+        time, channel, source, length = struct.unpack(RECORD_FORMAT, header)
+        self._next = (time, channel, source, self._file.read(length))
+
+
+def get_mode():
+    return _mode
+
+
+def start_record(filename):
+    global _mode, _recorder
+    _recorder = Recorder(filename)
+    _mode = MODE_RECORD
+
+
+def start_replay(filename):
+    global _mode, _player
+    _player = Player(filename)
+    _mode = MODE_REPLAY
+
+
+def flush():
+    """
+    Викликається оновленням на thread1 у режимі запису
+    """
+    recorder = _recorder
+    if recorder is not None:
+        recorder.flush()
+
+
+def advance():
+    """
+    Викликається циклом thread0 у режимі відтворення, False – записи закінчились
+    """
+    return _player.advance()
+
+
+def stop():
+    global _mode, _recorder, _player
+    mode, _mode = _mode, MODE_OFF
+    if mode == MODE_RECORD:
+        _recorder.close()
+    elif mode == MODE_REPLAY:
+        _player.close()
+    _recorder = None
+    _player = None
@@ -0,0 +1,211 @@
+import gc
+import heapq
+from array import array
+
+import utime
+
+from .stats import UpdateStats
+
+
+# Максимальний час простою за один раз (мкс), щоб цикл вчасно помічав зупинку контролера
+MAX_IDLE = 100000
+# Починаючи з цієї затримки (мкс) простій йде через sleep_ms, а не активне очікування
+IDLE_SLEEP_MS = 2000
+# Після цього значення (мкс) відлік часу зсувається, щоб не виходити за межі ticks_diff
+REBASE_PERIOD = 1 << 28
+# Максимальний простій (мкс), якщо є оновлення з triggers: запис змінної може прийти з іншого ядра
+TRIGGER_IDLE = 500
+
+# Що робити з пропущеними тактами оновлення з фіксованою частотою
+OVERRUN_SKIP = 0      # пропустити, зберігаючи фазу сітки тактів
+OVERRUN_CATCH_UP = 1  # виконати кожен пропущений такт підряд
+OVERRUN_COLLAPSE = 2  # один виклик замість усіх пропущених, сітка зсувається на час цього виклику
+
+
+class Scheduler:
+    """
+    Планувальник оновлень одного циклу (потоку).
+    Тримає оновлення у мін-купі за часом наступного виклику,
+    викликає тільки ті, час яких настав, і простоює до наступного
+    """
+    _updates: tuple
+    _heap: list
+    _base: int
+
+    stats: UpdateStats
+
+    # Для Supervisor: час останньої ітерації, поточне оновлення та час його початку (ticks_cpu),
+    # оновлення, що перевищило свій budget
+    heartbeat: int = 0
+    current: int = -1
+    current_start: int = 0
+    fault: int = -1
+
+    def __init__(self, updates, logger, track_alloc=False):
+        """
+        track_alloc – вимірювати виділену пам'ять кожного виклику (gc.mem_alloc() до та після),
+        інакше вимірюються тільки оновлення з alloc_budget
+        """
+        self._updates = tuple(updates)
+        self._logger = logger
+        self._track_alloc = track_alloc
+        self.stats = UpdateStats([i.name for i in self._updates], [i.freq for i in self._updates])
+        self._base = utime.ticks_cpu()
+        # Елемент купи: [час наступного виклику відносно _base, індекс оновлення]
+        self._heap = [[0, i] for i in range(len(self._updates))]
+        self._entries = tuple(self._heap)
+        heapq.heapify(self._heap)
+        # Оновлення, що запускаються записом змінних, та час початку їх останнього виклику
+        self._triggered = tuple(i for i in range(len(self._updates)) if self._updates[i].triggers)
+        self._last_start = array('l', [0] * len(self._updates))
+        # Для fixed_rate: виклик перенесено тригером раніше, _grid – такт сітки, на якому він стояв
+        self._early = bytearray(len(self._updates))
+        self._grid = array('l', [0] * len(self._updates))
+        self.heartbeat = utime.ticks_cpu()
+
+    def run_pending(self, controller):
+        """
+        Викликає оновлення, час яких настав.
+        Повертає кількість мкс до наступного виклику
+        """
+        heap = self._heap
+        # Навіть без оновлень цикл живий: інакше Supervisor вважав би його завислим
+        self.heartbeat = utime.ticks_cpu()
+        if not heap:
+            return MAX_IDLE
+        now = self._now()
+        if now >= REBASE_PERIOD:
+            self._rebase(now)
+            now = 0
+        # Не більше одного проходу по всіх оновленнях, щоб перевантажений цикл не зациклився тут
+        for _ in range(len(heap)):
+            if self._triggered:
+                self._apply_triggers(now)
+            entry = heap[0]
+            if entry[0] > now:
+                break
+            heapq.heappop(heap)
+            i = entry[1]
+            update = self._updates[i]
+            start = now
+            self._last_start[i] = start
+            self.current_start = utime.ticks_add(self._base, start)
+            self.current = i
+            measure = self._track_alloc or update.alloc_budget
+            if measure:
+                alloc = gc.mem_alloc()
+            try:
+                update.callback(controller)
+            except Exception as e:
+                self._logger.error(f'Error run update {update.name}: {str(e)}')
+            self.current = -1
+            if measure:
+                self._record_alloc(self.stats, self._logger, update, i, gc.mem_alloc() - alloc)
+            now = self._now()
+            if update.budget and now - start > update.budget:
+                self.fault = i
+            try:
+                self.stats.record(i, start - entry[0], now - start)
+            except Exception as e:
+                self._logger.error(f'Error record stats {update.name}: {str(e)}')
+            if self._early[i]:
+                # Виклик за тригером поза сіткою: сітка fixed_rate не зсувається
+                self._early[i] = 0
+                grid = self._grid[i]
+                entry[0] = grid if grid > now else self._next_due(update, grid, start, now)
+            else:
+                entry[0] = self._next_due(update, entry[0], start, now)
+            heapq.heappush(heap, entry)
+        if self._triggered:
+            self._apply_triggers(now)
+            return min(heap[0][0] - now, TRIGGER_IDLE)
+        return heap[0][0] - now
+
+    @staticmethod
+    def _record_alloc(stats, logger, update, i, alloc):
+        if stats.record_alloc(i, alloc, update.alloc_budget) and stats.alloc_over[i] == 1:
+            # Лише перше перевищення, щоб сам лог не виділяв пам'ять на кожному виклику
+            logger.warning(f'{update.name} allocated {alloc}B, alloc_budget={update.alloc_budget}B')
+
+    def get_fault(self, now, loop_budget):
+        """
+        Опис порушення або None.
+        now – ticks_cpu(), loop_budget – допустимий час між ітераціями циклу (мкс), 0 – без перевірки
+        """
+        if self.fault >= 0:
+            return f'{self._updates[self.fault].name} exceeded budget'
+        current = self.current
+        if current >= 0:
+            budget = self._updates[current].budget
+            if budget and utime.ticks_diff(now, self.current_start) > budget:
+                return f'{self._updates[current].name} exceeded budget'
+        if loop_budget and utime.ticks_diff(now, self.heartbeat) > loop_budget:
+            name = self._updates[current].name if current >= 0 else 'loop'
+            return f'{name} stalled'
+        return None
+
+    @staticmethod
+    def idle(wait):
+        """
+        Простій до наступного виклику.
+        Довгі очікування віддаються sleep_ms (ядро засинає), короткі – sleep_us
+        """
+        if wait <= 0:
+            return
+        if wait > MAX_IDLE:
+            wait = MAX_IDLE
+        if wait >= IDLE_SLEEP_MS:
+            utime.sleep_ms(wait // 1000 - 1)
+        else:
+            utime.sleep_us(wait)
+
+    def _apply_triggers(self, now):
+        """
+        Переносить виклик оновлень, змінні яких записали, на найближчий дозволений момент
+        """
+        changed = False
+        for i in self._triggered:
+            update = self._updates[i]
+            if not update.triggered:
+                continue
+            update.triggered = False
+            due = self._last_start[i] + update.trigger_period
+            if due < now:
+                due = now
+            entry = self._entries[i]
+            if due < entry[0]:
+                if update.fixed_rate and not self._early[i]:
+                    self._grid[i] = entry[0]
+                    self._early[i] = 1
+                entry[0] = due
+                changed = True
+        if changed:
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _next_due(update, due, start, now):
+        freq = update.freq
+        if not update.fixed_rate:
+            # Затримка рахується від завершення виклику
+            return now + freq
+        due += freq
+        if due > now:
+            return due
+        overrun = update.overrun
+        if overrun == OVERRUN_CATCH_UP:
+            return due
+        if overrun == OVERRUN_COLLAPSE:
+            return start + freq
+        return due + ((now - due) // freq + 1) * freq
+
+    def _now(self):
+        return utime.ticks_diff(utime.ticks_cpu(), self._base)
+
+    def _rebase(self, now):
+        # Зсув усіх часів на однакову величину не порушує порядок купи
+        self._base = utime.ticks_add(self._base, now)
+        for entry in self._heap:
+            entry[0] -= now
+        for i in range(len(self._last_start)):
+            self._last_start[i] -= now
+            self._grid[i] -= now
@@ -0,0 +1,134 @@
+import heapq
+
+import utime
+
+
+# Фази запуску: кожна фаза починається, коли попередню завершили обидва ядра
+PHASE_PROBE = 0      # підготовка заліза без налаштувань (піни, PWM, шини, ініціалізація модулів)
+PHASE_CONFIG = 1     # завантаження налаштувань
+PHASE_CALIBRATE = 2  # застосування налаштувань до заліза та калібрування
+PHASE_READY = 3      # решта підготовки частин перед першими оновленнями
+PHASES = ('probe', 'config', 'calibrate', 'ready')
+
+# Як часто (мкс) ядро перевіряє, чи завершило фазу інше ядро
+BARRIER_IDLE = 1000
+
+
+class After:
+    """
+    Кооперативне очікування замість sleep у startup:
+    `return After(50000, self._calibration_end)` – продовжити через 50 мс,
+    поки тим часом виконуються інші startup. Продовження теж може повернути After
+    """
+    delay: int
+    function = None
+
+    def __init__(self, delay, function):
+        self.delay = delay
+        self.function = function
+
+
+class StartupRunner:
+    """
+    Виконує startup одного ядра по фазах.
+    Startup, що повернули After, продовжуються одноразовими викликами за часом,
+    тож очікування різних частин перекриваються.
+    Для кожного startup рахується час виконання (busy) та загальний час до завершення (total)
+    """
+    failed: bool = False
+    done: bool = False
+
+    def __init__(self, startups, controller, core, phases_done, logger, allow_async=False):
+        """
+        core – номер ядра у phases_done (масив останніх завершених фаз обох ядер), None – без очікування іншого ядра
+        allow_async – startup можуть повертати корутини, їх забирає take_awaitables()
+        """
+        self._phases = tuple(tuple(i for i in startups if i.phase == phase) for phase in range(len(PHASES)))
+        self._controller = controller
+        self._core = core
+        self._phases_done = phases_done
+        self._logger = logger
+        self._allow_async = allow_async
+        self._phase = 0
+        self._started = False
+        # [час продовження, порядковий номер, функція, запис звіту]
+        self._pending = []
+        self._counter = 0
+        self._awaitables = []
+        self.report = []
+        self._start = utime.ticks_us()
+        self.duration = 0
+
+    def step(self):
+        """
+        Виконує startup поточної фази та продовження, час яких настав.
+        Повертає кількість мкс до наступної дії, -1 – всі фази завершено або startup завершився помилкою
+        """
+        while not self.failed:
+            if not self._started:
+                self._started = True
+                for startup in self._phases[self._phase]:
+                    record = [self._get_name(startup), self._phase, 0, 0, utime.ticks_us()]
+                    self.report.append(record)
+                    self._call(startup.function, record)
+            now = utime.ticks_us()
+            while self._pending and utime.ticks_diff(self._pending[0][0], now) <= 0 and not self.failed:
+                _, _, function, record = heapq.heappop(self._pending)
+                self._call(function, record)
+                now = utime.ticks_us()
+            if self.failed:
+                break
+            if self._pending:
+                return max(0, utime.ticks_diff(self._pending[0][0], now))
+            if self._core is not None:
+                self._phases_done[self._core] = self._phase
+                if self._phases_done[1 - self._core] < self._phase:
+                    return BARRIER_IDLE
+            self._phase += 1
+            self._started = False
+            if self._phase == len(PHASES):
+                self.done = True
+                self.duration = utime.ticks_diff(utime.ticks_us(), self._start)
+                return -1
+        if self._core is not None:
+            # Інше ядро не повинно чекати на фазу, яка вже не завершиться
+            self._phases_done[self._core] = len(PHASES)
+        return -1
+
+    def take_awaitables(self):
+        awaitables = self._awaitables
+        self._awaitables = []
+        return awaitables
+
+    def _call(self, function, record):
+        start = utime.ticks_us()
+        try:
+            result = function(self._controller)
+        except Exception as e:
+            self._logger.error(f'Error run startup {record[0]}: {str(e)}')
+            self.failed = True
+            return
+        end = utime.ticks_us()
+        record[2] += utime.ticks_diff(end, start)
+        if isinstance(result, After):
+            self._counter += 1
+            heapq.heappush(self._pending, [utime.ticks_add(end, result.delay), self._counter, result.function, record])
+            return
+        if result is not None and hasattr(result, 'send'):
+            if not self._allow_async:
+                self._logger.error(f'Error run startup {record[0]}: async startup needs async_mode')
+                self.failed = True
+                return
+            self._awaitables.append(result)
+        record[3] = utime.ticks_diff(end, record[4])
+
+    @staticmethod
+    def _get_name(startup):
+        if startup.owner is not None:
+            return type(startup.owner).__name__
+        return getattr(startup.function, '__name__', 'startup')
+
+    def log(self):
+        for name, phase, busy, total, _ in self.report:
+            self._logger.info(f"{name:<40} {PHASES[phase]:<10} busy={busy}us total={total}us")
+        self._logger.info(f"Startups done in {self.duration // 1000}ms")
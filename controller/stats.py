@@ -0,0 +1,127 @@
+from array import array
+
+
+# Кількість кошиків гістограми тривалості: кошик k рахує виклики тривалістю [2^k, 2^(k+1)) мкс
+HIST_BUCKETS = 16
+# Суми (час, запізнення, пам'ять) зберігаються двома частинами: total – молодші біти до TOTAL_CARRY,
+# total_hi – кількість переносів. Так total лишається малим цілим (без виділення пам'яті
+# і переповнення 32-бітного масиву), скільки б не працював цикл без скидання статистики
+TOTAL_BITS = 24
+TOTAL_CARRY = 1 << TOTAL_BITS
+
+
+def _accumulate(total, total_hi, i, value):
+    value += total[i]
+    if value >= TOTAL_CARRY:
+        total_hi[i] += value >> TOTAL_BITS
+        value &= TOTAL_CARRY - 1
+    total[i] = value
+
+
+class UpdateStats:
+    """
+    Лічильники часу виконання оновлень.
+    Усі масиви виділяються одразу, тож запис статистики не виділяє пам'ять
+    """
+
+    def __init__(self, names, freqs):
+        count = len(names)
+        self.names = tuple(names)
+        self.freqs = tuple(freqs)
+        self.calls = array('L', [0] * count)
+        self.time_total = array('l', [0] * count)
+        self.time_total_hi = array('L', [0] * count)
+        self.time_min = array('l', [0] * count)
+        self.time_max = array('l', [0] * count)
+        self.lag_total = array('l', [0] * count)
+        self.lag_total_hi = array('L', [0] * count)
+        self.lag_max = array('l', [0] * count)
+        self.missed = array('L', [0] * count)
+        self.hist = array('L', [0] * (count * HIST_BUCKETS))
+        # Виділення пам'яті (байт) за виклик, рахуються тільки для виміряних викликів
+        self.alloc_calls = array('L', [0] * count)
+        self.alloc_total = array('L', [0] * count)
+        self.alloc_total_hi = array('L', [0] * count)
+        self.alloc_max = array('L', [0] * count)
+        self.alloc_over = array('L', [0] * count)
+
+    def record(self, i, lag, duration):
+        """
+        Запис одного виклику.
+        lag – запізнення відносно запланованого часу, duration – тривалість виклику (мкс)
+        """
+        calls = self.calls[i] + 1
+        self.calls[i] = calls
+        _accumulate(self.time_total, self.time_total_hi, i, duration)
+        if calls == 1 or duration < self.time_min[i]:
+            self.time_min[i] = duration
+        if duration > self.time_max[i]:
+            self.time_max[i] = duration
+        if lag > 0:
+            _accumulate(self.lag_total, self.lag_total_hi, i, lag)
+            if lag > self.lag_max[i]:
+                self.lag_max[i] = lag
+            if lag >= self.freqs[i]:
+                self.missed[i] += 1
+        bucket = 0
+        while duration > 1 and bucket < HIST_BUCKETS - 1:
+            duration >>= 1
+            bucket += 1
+        self.hist[i * HIST_BUCKETS + bucket] += 1
+
+    def record_alloc(self, i, alloc, budget):
+        """
+        Запис виділеної за виклик пам'яті, повертає True, якщо перевищено budget (0 – без обмеження)
+        """
+        if alloc < 0:
+            # Між вимірами пройшло збирання сміття
+            return False
+        self.alloc_calls[i] += 1
+        _accumulate(self.alloc_total, self.alloc_total_hi, i, alloc)
+        if alloc > self.alloc_max[i]:
+            self.alloc_max[i] = alloc
+        if budget and alloc > budget:
+            self.alloc_over[i] += 1
+            return True
+        return False
+
+    def reset(self):
+        for values in (self.calls, self.time_total, self.time_total_hi, self.time_min, self.time_max,
+                       self.lag_total, self.lag_total_hi, self.lag_max, self.missed, self.hist,
+                       self.alloc_calls, self.alloc_total, self.alloc_total_hi, self.alloc_max, self.alloc_over):
+            for j in range(len(values)):
+                values[j] = 0
+
+    def get_time_total(self, i):
+        return (self.time_total_hi[i] << TOTAL_BITS) + self.time_total[i]
+
+    def get(self, i):
+        calls = self.calls[i]
+        alloc_total = (self.alloc_total_hi[i] << TOTAL_BITS) + self.alloc_total[i]
+        return {
+            'name': self.names[i],
+            'freq': self.freqs[i],
+            'calls': calls,
+            'time_min': self.time_min[i],
+            'time_max': self.time_max[i],
+            'time_mean': self.get_time_total(i) // calls if calls else 0,
+            'lag_max': self.lag_max[i],
+            'lag_mean': ((self.lag_total_hi[i] << TOTAL_BITS) + self.lag_total[i]) // calls if calls else 0,
+            'missed': self.missed[i],
+            'hist': list(self.hist[i * HIST_BUCKETS:(i + 1) * HIST_BUCKETS]),
+            'alloc_mean': alloc_total // self.alloc_calls[i] if self.alloc_calls[i] else 0,
+            'alloc_max': self.alloc_max[i],
+            'alloc_over': self.alloc_over[i],
+        }
+
+    def get_all(self):
+        return [self.get(i) for i in range(len(self.names))]
+
+    def log(self, logger):
+        for i in range(len(self.names)):
+            s = self.get(i)
+            logger.info(
+                f"{s['name']:<40} calls={s['calls']} time={s['time_min']}/{s['time_mean']}/{s['time_max']}us "
+                f"lag={s['lag_mean']}/{s['lag_max']}us missed={s['missed']}"
+                + (f" alloc={s['alloc_mean']}/{s['alloc_max']}B over={s['alloc_over']}" if self.alloc_calls[i] else "")
+            )
@@ -0,0 +1,85 @@
+import os
+import _thread
+
+import utime
+from machine import WDT
+
+
+FILENAME_FAULT = '.fault'
+
+
+class Supervisor:
+    """
+    Нагляд за обома циклами.
+    Годує апаратний watchdog тільки поки обидва цикли проходять ітерації вчасно
+    і жоден callback не перевищив свій budget (див. Update).
+    При порушенні переводить виконавчі пристрої у безпечний стан (Failsafe),
+    записує винуватця у FILENAME_FAULT та зупиняє контролер, далі плату перезапустить watchdog
+    """
+    def __init__(self, timeout, failsafes, logger):
+        """
+        timeout – таймаут watchdog (мс), 0 – без апаратного watchdog, тільки контроль budget
+        """
+        self._timeout = timeout
+        # Допустимий час (мкс) між ітераціями циклу, з запасом до спрацювання watchdog
+        self._loop_budget = timeout * 1000 // 2
+        self._failsafes = failsafes
+        self._logger = logger
+        self._wdt = None
+        self._fault = None
+        # check викликають обидва ядра: порушення обробляє те, що першим захопило блокування (не звільняється)
+        self._fault_lock = _thread.allocate_lock()
+
+    def start(self):
+        if self._timeout:
+            self._wdt = WDT(timeout=self._timeout)
+
+    def check(self, controller, schedulers):
+        """
+        Викликається з кожної ітерації обох циклів
+        """
+        if self._fault is not None:
+            return
+        now = utime.ticks_cpu()
+        for n, scheduler in enumerate(schedulers):
+            if scheduler is None:
+                continue
+            fault = scheduler.get_fault(now, self._loop_budget)
+            if fault is not None:
+                self._on_fault(controller, f'thread{n}: {fault}')
+                return
+        if self._wdt is not None:
+            self._wdt.feed()
+
+    def _on_fault(self, controller, fault):
+        if not self._fault_lock.acquire(0):
+            return
+        self._fault = fault
+        self._logger.critical(f'Fault {fault}')
+        for failsafe in self._failsafes:
+            try:
+                failsafe.function(controller)
+            except Exception as e:
+                self._logger.error(f'Error run failsafe: {str(e)}')
+        self.write_fault(fault)
+        controller.stop()
+
+    @staticmethod
+    def write_fault(fault):
+        try:
+            f = open(FILENAME_FAULT, 'w')
+            f.write(fault)
+            f.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def read_fault():
+        try:
+            f = open(FILENAME_FAULT, 'r')
+            fault = f.read()
+            f.close()
+            os.remove(FILENAME_FAULT)
+            return fault
+        except Exception:
+            return None
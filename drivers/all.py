@@ -16,7 +16,9 @@ from .low_level import (
     DriverAccel,
     DriverGyro,
 )
-from controller import DELAY_NORMAL
+from .base import BaseDriver
+from controller import DELAY_NORMAL, After
+from controller.recording import Input, INPUT_GYRO, INPUT_ACCEL
 from libs.mpu6050 import MPU6050 as _MPU6050
 
 
@@ -55,9 +57,11 @@ class ESCBrushed1625(DriverESCMotor):
     duty_start = 4000
     duty_end = 6000
 
-    def _calibration(self):
+    def _calibration(self, controller):
         self.motor_value(1)
-        utime.sleep(0.05)
+        return After(50000, self._calibration_end)
+
+    def _calibration_end(self, controller):
         self.motor_value(0)
 
 
@@ -83,27 +87,50 @@ class MPU6050(_MPU6050, DriverAccel, DriverGyro):
     """
     Драйвер для MPU6050 (акселерометр та гіроскоп)
     """
-    def __init__(self, i2c_id: int, pin_sda: Pin, pin_scl: Pin, freq=400000):
-        self._i2c = I2C(i2c_id, sda=pin_sda, scl=pin_scl, freq=freq)
-        self._mpu = super().__init__(self._i2c)
+    # Час від старту плати (мс), за який встановлюється живлення датчика
+    settle_ms = 200
+
+    def __init__(self, i2c_id: int, pin_sda: Pin, pin_scl: Pin, freq=400000, device_addr=0):
+        """
+        device_addr – 0 (0x68) або 1 (0x69), None – пошук датчика скануванням шини
+        """
+        BaseDriver.__init__(self)
+        self._i2c_id = i2c_id
+        self._pin_sda = pin_sda
+        self._pin_scl = pin_scl
+        self._freq = freq
+        self._device_addr = device_addr
+        self._input_accel = (Input(INPUT_ACCEL, '<f'), Input(INPUT_ACCEL, '<f'), Input(INPUT_ACCEL, '<f'))
+        self._input_gyro = (Input(INPUT_GYRO, '<f'), Input(INPUT_GYRO, '<f'), Input(INPUT_GYRO, '<f'))
+
+    def _startup(self, controller):
+        self._i2c = I2C(self._i2c_id, sda=self._pin_sda, scl=self._pin_scl, freq=self._freq)
+        # Зазвичай до цього моменту час встановлення живлення вже минув, і чекати не потрібно
+        wait = self.settle_ms - utime.ticks_ms()
+        if wait > 0:
+            return After(wait * 1000, self._probe)
+        self._probe(controller)
+
+    def _probe(self, controller):
+        _MPU6050.__init__(self, self._i2c, self._device_addr, settle_ms=0)
 
     def get_accel_x(self):
-        return self.accel.x
+        return self._input_accel[0].filter(self.accel.x)
 
     def get_accel_y(self):
-        return self.accel.y
+        return self._input_accel[1].filter(self.accel.y)
 
     def get_accel_z(self):
-        return self.accel.z
+        return self._input_accel[2].filter(self.accel.z)
 
     def get_gyro_x(self):
-        return self.gyro.x
+        return self._input_gyro[0].filter(self.gyro.x)
 
     def get_gyro_y(self):
-        return self.gyro.y
+        return self._input_gyro[1].filter(self.gyro.y)
 
     def get_gyro_z(self):
-        return self.gyro.z
+        return self._input_gyro[2].filter(self.gyro.z)
 
 
 class LiionBattery1s(DriverBattery):
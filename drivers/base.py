@@ -1,13 +1,43 @@
 class BaseDriver:
     delay_update: int = 0
-    thread: bool = False
+    # True/False – закріплення за thread1/thread0, None – thread0 або автоматичний розподіл
+    thread: bool = None
+    # Частини з однаковим core_group при автоматичному розподілі працюють на одному ядрі
+    core_group: str = None
+    fixed_rate: bool = False
+    overrun: int = None
+    hard: bool = False
+    # Змінні, запис яких одразу запускає _update (див. Update)
+    update_triggers: tuple = tuple()
+    trigger_period: int = 0
+    # Максимальна тривалість _update (мкс) для Supervisor, 0 – без обмеження
+    update_budget: int = 0
+    # Скільки пам'яті (байт) може виділити один виклик _update, 0 – без обмеження
+    update_alloc_budget: int = 0
+    # Фаза запуску _startup (див. controller.startup), None – PHASE_PROBE
+    startup_phase: int = None
 
     def __init__(self):
-        from controller import Startup, Shutdown, Update
-        Startup(self._startup, thread=self.thread)
-        Shutdown(self._shutdown, thread=self.thread)
+        from controller import Startup, Shutdown, Update, Failsafe, PHASE_PROBE
+        phase = PHASE_PROBE if self.startup_phase is None else self.startup_phase
+        Startup(self._startup, thread=self.thread, owner=self, phase=phase)
+        Shutdown(self._shutdown, thread=self.thread, owner=self)
+        Failsafe(self._failsafe, owner=self)
         if self.delay_update > 0:
-            Update(self._update, self.delay_update, thread=self.thread)
+            Update(
+                self._update,
+                self.delay_update,
+                thread=self.thread,
+                name=type(self).__name__,
+                fixed_rate=self.fixed_rate,
+                overrun=self.overrun,
+                hard=self.hard,
+                owner=self,
+                triggers=self.update_triggers,
+                trigger_period=self.trigger_period,
+                budget=self.update_budget,
+                alloc_budget=self.update_alloc_budget,
+            )
 
     def _startup(self, controller):
         pass
@@ -17,3 +47,6 @@ class BaseDriver:
 
     def _update(self, controller):
         pass
+
+    def _failsafe(self, controller):
+        pass
@@ -4,7 +4,8 @@
 import rp2
 import utime
 
-from controller import DELAY_SLOW, DELAY_NORMAL
+from controller import DELAY_SLOW, DELAY_NORMAL, Startup, PHASE_CALIBRATE
+from controller.recording import Input, INPUT_ENCODER, INPUT_DIRECTION, INPUT_ADC
 from .base import BaseDriver
 from machine import Pin, PWM, ADC
 
@@ -49,6 +50,9 @@ class DriverPWMServo(BaseDriver):
 
     def _shutdown(self, controller):
         self._pwm.deinit()
+
+    def _failsafe(self, controller):
+        self.set_angle(self._start_angle)
     
     def _get_correct_angle(self, angle: float):
         if angle < 0:
@@ -111,6 +115,9 @@ class DriverMotor(BaseDriver):
     def motor_value(self, motor_value: float):
         pass
 
+    def _failsafe(self, controller):
+        self.motor_value(0)
+
     @staticmethod
     def _get_correct_motor_value(motor_value: float):
         if motor_value < -1:
@@ -195,6 +202,7 @@ class DriverESCMotor(DriverMotor):
     def __init__(self, pin: Pin) -> None:
         super().__init__()
         self._pin = pin
+        Startup(self._calibration, thread=self.thread, owner=self, phase=PHASE_CALIBRATE)
 
     def motor_value(self, value: float):
         value = self._get_correct_motor_value(value)
@@ -204,13 +212,15 @@ class DriverESCMotor(DriverMotor):
             self._pwm.duty_u16(duty)
         return True
 
-    def _calibration(self):
+    def _calibration(self, controller):
+        """
+        Калібрування регулятора, для очікувань повертає After (див. controller.startup)
+        """
         pass
 
     def _startup(self, controller):
         self._pwm = PWM(self._pin)
         self._pwm.freq(self.freq)
-        self._calibration()
 
     def _shutdown(self, controller):
         self._pwm.deinit()
@@ -236,6 +246,7 @@ class DriverEncoder(DriverMotor):
         super().__init__()
         self._pin0 = pin0
         self._count_pulses_rotation = count_pulses_rotation
+        self._input_count = Input(INPUT_ENCODER, '<i')
 
     def get_rpm(self):
         return self._rpm
@@ -248,7 +259,7 @@ class DriverEncoder(DriverMotor):
         self._sm_count.active(1)
 
     def _update(self, controller):
-        count_sm = self._get_sm_last_value(self._sm_count, 0)
+        count_sm = self._input_count.filter(self._get_sm_last_value(self._sm_count, 0))
         self._calc_rpm(count_sm)
 
     def _calc_rpm(self, count_sm):
@@ -306,6 +317,7 @@ class DriverDirectionEncoder(DriverEncoder):
         super().__init__(pin0, count_pulses_rotation)
         self._pin1 = pin1
         self._invert_direction = invert_direction
+        self._input_direction = Input(INPUT_DIRECTION, '<i')
 
     def get_direction(self):
         return self._direction
@@ -318,7 +330,7 @@ class DriverDirectionEncoder(DriverEncoder):
     def _update(self, controller):
         super()._update(controller)
 
-        direction = self._get_sm_last_value(self._sm_direction, 0)
+        direction = self._input_direction.filter(self._get_sm_last_value(self._sm_direction, 0))
         self._direction = self._calc_direction(direction)
 
     def _calc_direction(self, direction_sm):
@@ -405,6 +417,7 @@ class DriverBattery(BaseDriver):
         self._r1 = r1
         self._r2 = r2
         self._rdel = r2/(r1+r2)
+        self._input_adc = Input(INPUT_ADC, '<H')
 
     def get_voltage(self):
         return round(self._voltage, 2)
@@ -413,7 +426,7 @@ class DriverBattery(BaseDriver):
         return self._percent
 
     def get_current_voltage(self):
-        u16 = self._adc_battery.read_u16()
+        u16 = self._input_adc.filter(self._adc_battery.read_u16())
         voltage = u16 / 65535 * 3.3
         voltage_battery = voltage / self._rdel
         return voltage_battery
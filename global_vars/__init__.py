@@ -13,4 +13,7 @@ from .vars import (
     FLOAT,
     UNSIGNED_BYTE,
     UNSIGNED_SHORT,
+    FILENAME_CONFIG,
+    FILENAME_JOURNAL,
+    set_config_file,
 )
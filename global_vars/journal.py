@@ -0,0 +1,142 @@
+"""
+Двійковий журнал налаштувань: файл із записів фіксованої довжини, нові значення дописуються в кінець.
+
+Запис (RECORD_SIZE байт, little-endian):
+    адреса (B), тип struct (B, код символу), номер запису (I), значення (4 байти), CRC-16/CCITT перших 10 байт (H)
+
+Зміна одного налаштування – один запис у кінець файлу замість перезапису всього файлу.
+Коли файл перевищує compact_size, він переписується з одним записом на змінну (стиснення).
+Запис, обірваний вимкненням живлення, не проходить CRC і пропускається при читанні,
+а наступне збереження стискає файл
+"""
+import os
+import struct
+
+
+RECORD_SIZE = 12
+# Після якого розміру файлу (байт) журнал стискається
+JOURNAL_COMPACT_SIZE = 4096
+
+_HEADER = '<BBI'
+_VALUE_OFFSET = 6
+_CRC_OFFSET = 10
+_TYPES = b'cbhilfBH'
+
+
+def crc16(data, start, end):
+    crc = 0xFFFF
+    for i in range(start, end):
+        crc ^= data[i] << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def replace_file(filename, data):
+    """
+    Записує data у тимчасовий файл і замінює ним filename,
+    тож вимкнення живлення посередині запису не зіпсує наявний файл
+    """
+    filename_tmp = filename + '.tmp'
+    f = open(filename_tmp, "wb" if isinstance(data, (bytes, bytearray)) else "w")
+    f.write(data)
+    f.close()
+    try:
+        os.rename(filename_tmp, filename)
+    except OSError:
+        # Файлова система не замінює наявний файл при rename
+        os.remove(filename)
+        os.rename(filename_tmp, filename)
+
+
+class Journal:
+    def __init__(self, filename, compact_size=JOURNAL_COMPACT_SIZE):
+        self.filename = filename
+        self._compact_size = compact_size
+        self._record = bytearray(RECORD_SIZE)
+        # Значення у файлі: адреса (int) -> значення
+        self._saved = {}
+        self._sequence = 0
+        self._size = 0
+        self._compact = False
+        self._loaded = False
+        self.corrupted = 0
+        self.compactions = 0
+
+    def load(self):
+        """
+        Читає файл одним проходом. Повертає {адреса (int): значення}, для кожної адреси – останній запис
+        """
+        try:
+            f = open(self.filename, "rb")
+            data = f.read()
+            f.close()
+        except OSError:
+            data = b''
+        values = {}
+        sequences = {}
+        self.corrupted = 0
+        size = len(data) - len(data) % RECORD_SIZE
+        if size != len(data):
+            self.corrupted += 1
+        for offset in range(0, size, RECORD_SIZE):
+            slot, type_code, sequence = struct.unpack_from(_HEADER, data, offset)
+            crc = struct.unpack_from('<H', data, offset + _CRC_OFFSET)[0]
+            if type_code not in _TYPES or crc16(data, offset, offset + _CRC_OFFSET) != crc:
+                self.corrupted += 1
+                continue
+            if slot in sequences and sequences[slot] > sequence:
+                continue
+            sequences[slot] = sequence
+            values[slot] = struct.unpack_from('<' + chr(type_code), data, offset + _VALUE_OFFSET)[0]
+            if sequence >= self._sequence:
+                self._sequence = sequence + 1
+        self._saved = dict(values)
+        self._size = len(data)
+        self._compact = self.corrupted > 0
+        self._loaded = True
+        return values
+
+    def save(self, entries):
+        """
+        entries – (адреса, тип struct, значення) усіх налаштувань.
+        Дописує тільки змінені значення або стискає файл, якщо він завеликий чи пошкоджений
+        """
+        if not self._loaded:
+            # Номери записів продовжують наявний файл, інакше старі записи переважили б нові
+            self.load()
+        changed = [entry for entry in entries if entry[0] not in self._saved or self._saved[entry[0]] != entry[2]]
+        if not changed:
+            return
+        if self._compact or self._size + len(changed) * RECORD_SIZE > self._compact_size:
+            self._write_all(entries)
+            return
+        f = open(self.filename, "ab")
+        for slot, type_var, value in changed:
+            f.write(self._pack(slot, type_var, value))
+            self._saved[slot] = value
+        f.close()
+        self._size += len(changed) * RECORD_SIZE
+
+    def _write_all(self, entries):
+        data = bytearray()
+        for slot, type_var, value in entries:
+            data.extend(self._pack(slot, type_var, value))
+        replace_file(self.filename, data)
+        self._saved = {entry[0]: entry[2] for entry in entries}
+        self._size = len(data)
+        self._compact = False
+        self.compactions += 1
+
+    def _pack(self, slot, type_var, value):
+        record = self._record
+        for i in range(_VALUE_OFFSET, _CRC_OFFSET):
+            record[i] = 0
+        struct.pack_into(_HEADER, record, 0, slot, ord(type_var), self._sequence)
+        struct.pack_into('<' + type_var, record, _VALUE_OFFSET, value)
+        struct.pack_into('<H', record, _CRC_OFFSET, crc16(record, 0, _CRC_OFFSET))
+        self._sequence += 1
+        return record
@@ -1,9 +1,14 @@
-import struct
+import _thread
+from array import array
 
+import machine
 import utime
 import ujson
 from logging import getLogger
-from controller import Startup
+from controller import Update, Startup, Shutdown, DELAY_SLOW, PHASE_CONFIG
+from controller.hard import running as hard_running
+from controller.context import DEFAULT as DEFAULT_CONTEXT, register as register_context, get_context
+from .journal import Journal, replace_file
 
 logger = getLogger('global_vars')
 
@@ -33,6 +38,9 @@ LENGTH_VARS = {
 }
 
 FILENAME_CONFIG = 'config.json'
+FILENAME_JOURNAL = 'config.bin'
+# Скільки мс після останньої зміни SYNC_CONFIG чекати перед записом файлу: серія змін – один запис
+CONFIG_SAVE_DELAY = 1000
 
 AVAILABLE_PARAMS = (
     SYNC_CONFIG,
@@ -43,23 +51,150 @@ AVAILABLE_PARAMS = (
 AVAILABLE_TYPES = (CHAR, BOOL, BYTE, SHORT, INT, LONG, FLOAT)
 
 
-_vars = {}
+# Допустимі значення типів, як у struct.pack
+_RANGES = {
+    BYTE: (-0x80, 0x7F),
+    UNSIGNED_BYTE: (0, 0xFF),
+    SHORT: (-0x8000, 0x7FFF),
+    UNSIGNED_SHORT: (0, 0xFFFF),
+    INT: (-0x80000000, 0x7FFFFFFF),
+    LONG: (-0x80000000, 0x7FFFFFFF),
+    FLOAT: (-3.4028234663852886e38, 3.4028234663852886e38),
+}
+_NUMBER = (int, float)
+
+
+def _check_char(value):
+    return isinstance(value, bytes) and len(value) == 1
+
+
+def _make_validator(type_var, min_value=None, max_value=None):
+    """
+    Перевірка значення для змінної: тип і межі (типу та min/max) зібрані один раз при реєстрації,
+    тож запис не виділяє пам'ять, на відміну від перевірки через struct.pack
+    """
+    if type_var == CHAR:
+        return _check_char
+    low, high = _RANGES[type_var]
+    if min_value is not None and min_value > low:
+        low = min_value
+    if max_value is not None and max_value < high:
+        high = max_value
+    if type_var == FLOAT:
+        def check(value):
+            return isinstance(value, _NUMBER) and low <= value <= high
+    else:
+        def check(value):
+            return isinstance(value, int) and low <= value <= high
+    return check
+
+
+# Кількість адрес: адреса змінної – один байт
+SLOTS = 256
+
+# Коди типів у сховищі, 0 – адреса вільна
+_TYPE_CODES = (None, CHAR, BYTE, SHORT, INT, LONG, FLOAT, UNSIGNED_BYTE, UNSIGNED_SHORT)
+
+# Сховище змінних: масиви з індексом за байтом адреси.
+# _values – значення, _defaults – значення за замовчуванням, _types – код типу (_TYPE_CODES),
+# _last_update – ticks_ms останнього запису, _min/_max – межі (None – без межі), _params – бітова маска параметрів,
+# _validators – перевірка значення (_make_validator)
+_values = [None] * SLOTS
+_defaults = [None] * SLOTS
+_types = bytearray(SLOTS)
+_last_update = array('i', bytes(4 * SLOTS))
+_min = [None] * SLOTS
+_max = [None] * SLOTS
+_params = bytearray(SLOTS)
+_validators = [None] * SLOTS
+
+# Seqlock для узгодженого читання змінних з двох ядер:
+# запис робить _seq непарним на час зміни, читач повторює читання, якщо _seq змінився.
+# Записи між собою впорядковує _write_lock, читання блокувань не бере.
+# На час непарного _seq переривання вимкнені, щоб обробник на тому ж ядрі не чекав на незавершений запис.
+# Запис з переривань і жорсткого рівня заборонений: _write_lock не повторно входимий
+_seq = 0
+_write_lock = _thread.allocate_lock()
+_SEQ_MASK = 0x3FFFFFFF
+# Скільки разів читач повторює читання, далі повертає значення як є (кожне ціле, але разом можуть бути неузгоджені)
+SEQ_RETRIES = 100
+# Виняток створено заздалегідь: на жорсткому рівні виділяти пам'ять не можна
+_HARD_WRITE_ERROR = RuntimeError('Var.set is not allowed from hard tier callbacks')
+
+# Підписники на зміну змінних: слот -> список об'єктів, яким при зміні ставиться triggered = True
+_subscribers = [None] * SLOTS
+
+# Файл налаштувань активного контексту, None – SYNC_CONFIG не зберігається
+_config_file = FILENAME_CONFIG
+# Незбережені зміни SYNC_CONFIG: [є зміни, ticks_ms останньої зміни]
+_config_dirty = array('i', (0, 0))
+# Двійковий журнал замість JSON (див. set_config_file), None – _config_file у форматі JSON
+_config_journal = None
+
+
+def _copy_store(store):
+    """
+    Копія сховища зі значеннями за замовчуванням
+    """
+    values, defaults, types, _, min_values, max_values, params, validators = store
+    last_update = array('i', bytes(4 * SLOTS))
+    now = utime.ticks_ms()
+    for slot in range(SLOTS):
+        if types[slot]:
+            last_update[slot] = now
+    return list(defaults), list(defaults), bytearray(types), last_update, list(min_values), list(max_values), bytearray(params), list(validators)
+
+
+def _bind_context(context):
+    """
+    Сховище, _subscribers та _config_file належать контексту (див. controller.context).
+    Новий контекст отримує всі змінні контексту за замовчуванням зі значеннями за замовчуванням
+    і не має файлу налаштувань, щоб моделі в одному процесі не писали в один файл
+    """
+    global _values, _defaults, _types, _last_update, _min, _max, _params, _validators
+    global _subscribers, _config_file, _config_dirty, _config_journal
+    data = context.data.get('global_vars')
+    if data is None:
+        default = DEFAULT_CONTEXT.data['global_vars']
+        data = context.data['global_vars'] = [_copy_store(default[0]), [None] * SLOTS, None, array('i', (0, 0)), None]
+    store, _subscribers, _config_file, _config_dirty, _config_journal = data
+    _values, _defaults, _types, _last_update, _min, _max, _params, _validators = store
+
+
+DEFAULT_CONTEXT.data['global_vars'] = [
+    (_values, _defaults, _types, _last_update, _min, _max, _params, _validators),
+    _subscribers, _config_file, _config_dirty, _config_journal,
+]
+
+
+def set_config_file(filename, journal=False):
+    """
+    Файл налаштувань активного контексту, викликати до запуску контролера.
+    journal=True – двійковий журнал (global_vars/journal.py) замість JSON, наприклад set_config_file(FILENAME_JOURNAL, True).
+    filename=None – не зберігати SYNC_CONFIG
+    """
+    data = get_context().data['global_vars']
+    data[2] = filename
+    data[4] = Journal(filename) if journal and filename is not None else None
+    _bind_context(get_context())
 
 
 class Var:
     _addr: bytes
+    # Індекс у сховищі (байт адреси)
+    _slot: int
 
     def __init__(self, addr: bytes, type_var=None, default_value=None, min_value=None, max_value=None, params=None):
-        global _vars
         if len(addr) != 1:
             raise ValueError('addr має мати довжину 1 байт')
         if params is None:
             params = []
+        slot = addr[0]
 
-        is_new = addr not in _vars
+        is_new = not _types[slot]
 
         if not is_new and type_var is None:
-            type_var = _vars[addr].type_var
+            type_var = _TYPE_CODES[_types[slot]]
         elif isinstance(type_var, str) and type_var in AVAILABLE_TYPES:
             pass
         elif type_var == bool:
@@ -70,10 +205,15 @@ class Var:
             type_var = FLOAT
         else:
             raise ValueError(f'type_var={type_var} не підтримується')
+        if not is_new:
+            # Тип зареєстрованої змінної не змінюється: межі та перевірка значень – за ним
+            type_var = _TYPE_CODES[_types[slot]]
 
+        mask = 0
         for param in params:
             if param not in AVAILABLE_PARAMS:
                 raise ValueError(f'param={param} не підтримується')
+            mask |= 1 << param
 
         correct_value = self._check_value_with_type(type_var, default_value)
         correct_min_value = True if min_value is None else self._check_value_with_type(type_var, min_value)
@@ -81,147 +221,309 @@ class Var:
 
         if is_new:
             if correct_value and correct_min_value and correct_max_value:
-                _vars[addr] = _LocalVar(type_var, default_value, min_value, max_value, list(params))
+                _values[slot] = default_value
+                _defaults[slot] = default_value
+                _types[slot] = _TYPE_CODES.index(type_var)
+                _last_update[slot] = utime.ticks_ms()
+                _min[slot] = min_value
+                _max[slot] = max_value
+                _params[slot] = mask
+                _validators[slot] = _make_validator(type_var, min_value, max_value)
             else:
                 raise ValueError(f'{(default_value, min_value, max_value)} не може існувати для type_var={type_var}')
         elif correct_min_value and correct_max_value:
-            if min_value is not None and _vars[addr].min_value is None:
-                _vars[addr].min_value = min_value
-            if max_value is not None and _vars[addr].max_value is None:
-                _vars[addr].max_value = max_value
-
-            for param in params:
-                if param not in _vars[addr].params:
-                    _vars[addr].params.append(param)
+            if min_value is not None and _min[slot] is None:
+                _min[slot] = min_value
+            if max_value is not None and _max[slot] is None:
+                _max[slot] = max_value
+            if min_value is not None or max_value is not None:
+                _validators[slot] = _make_validator(type_var, _min[slot], _max[slot])
+            _params[slot] |= mask
         else:
             raise ValueError(f'Значення={(min_value, max_value)} не може існувати для type_var={type_var}')
 
         self._addr = addr
+        self._slot = slot
 
     def set(self, value):
         return self.addr_set(self._addr, value)
 
+    def set_unchecked(self, value):
+        """
+        Запис без перевірки типу та меж – тільки для значень, коректність яких гарантує сам код
+        """
+        _write(self._slot, value)
+        return True
+
     def get(self):
-        return self.addr_get(self._addr)
+        return _values[self._slot]
 
     def get_addr(self):
         return self._addr
 
     def get_last_update(self):
-        return self.addr_last_update(self._addr)
+        return _last_update[self._slot]
+
+    def get_with_last_update(self):
+        return self.addr_get_with_last_update(self._addr)
 
     def get_type_var(self):
-        return self.addr_get_type_var(self._addr)
+        return _TYPE_CODES[_types[self._slot]]
 
     def get_length_type_var(self):
-        return self.addr_get_length_type_var(self._addr)
+        return LENGTH_VARS[_TYPE_CODES[_types[self._slot]]]
 
     def get_params(self):
         return self.addr_get_params(self._addr)
 
+    def has_param(self, param):
+        return bool(_params[self._slot] & (1 << param))
+
+    def subscribe(self, target):
+        """
+        Після кожного запису змінної target.triggered стає True (наприклад, для Update)
+        """
+        self.addr_subscribe(self._addr, target)
+
     @classmethod
     def get_vars(cls, params):
+        mask = 0
+        for param in params:
+            mask |= 1 << param
         res = []
-        for addr in _vars:
-            is_add = True
-            for param in params:
-                if param not in _vars[addr].params:
-                    is_add = False
-                    break
-            if is_add:
-                res.append(cls(addr))
+        for slot in range(SLOTS):
+            if _types[slot] and _params[slot] & mask == mask:
+                res.append(cls(bytes((slot,))))
         return res
 
-    @classmethod
-    def addr_set(cls, addr, value):
-        type_var = cls.addr_get_type_var(addr)
-        if cls._check_value_with_type(type_var, value):
-            if _vars[addr].min_value is None or value >= _vars[addr].min_value:
-                if _vars[addr].max_value is None or value <= _vars[addr].max_value:
-                    _vars[addr].value = value
-                    _vars[addr].last_update = utime.ticks_ms()
-                    if SYNC_CONFIG in _vars[addr].params:
-                        config_file_save()
-                    return True
-        raise ValueError(f'value={value} не може існувати для type_var={type_var}')
+    @staticmethod
+    def snapshot(variables, out=None):
+        """
+        Узгоджені значення кількох змінних: жоден запис не потрапить посередині читання.
+        out – список довжини len(variables) для результату, щоб не виділяти пам'ять на кожен виклик
+        """
+        if out is None:
+            out = [None] * len(variables)
+        for _ in range(SEQ_RETRIES):
+            seq = _seq
+            if seq & 1:
+                continue
+            for i in range(len(variables)):
+                out[i] = _values[variables[i]._slot]
+            if seq == _seq:
+                return out
+        for i in range(len(variables)):
+            out[i] = _values[variables[i]._slot]
+        return out
+
+    @staticmethod
+    def addr_set(addr, value):
+        slot = addr[0]
+        validator = _validators[slot]
+        if validator is not None and validator(value):
+            _write(slot, value)
+            return True
+        raise ValueError(f'value={value} не може існувати для type_var={_TYPE_CODES[_types[slot]]}')
+
+    @staticmethod
+    def addr_set_unchecked(addr, value):
+        _write(addr[0], value)
+        return True
+
+    @staticmethod
+    def addr_subscribe(addr, target):
+        slot = addr[0]
+        if _subscribers[slot] is None:
+            _subscribers[slot] = []
+        if target not in _subscribers[slot]:
+            _subscribers[slot].append(target)
 
     @staticmethod
     def addr_is_var(addr):
-        return addr in _vars
+        return _types[addr[0]] != 0
 
     @staticmethod
     def addr_get(addr):
-        return _vars[addr].value
+        return _values[addr[0]]
 
     @staticmethod
     def addr_last_update(addr):
-        return _vars[addr].last_update
+        return _last_update[addr[0]]
+
+    @staticmethod
+    def addr_get_with_last_update(addr):
+        """
+        Значення та час його запису, прочитані узгоджено
+        """
+        slot = addr[0]
+        for _ in range(SEQ_RETRIES):
+            seq = _seq
+            if seq & 1:
+                continue
+            value, last_update = _values[slot], _last_update[slot]
+            if seq == _seq:
+                return value, last_update
+        return _values[slot], _last_update[slot]
 
     @staticmethod
     def addr_get_type_var(addr):
-        return _vars[addr].type_var
+        return _TYPE_CODES[_types[addr[0]]]
 
     @staticmethod
     def addr_get_length_type_var(addr):
-        return LENGTH_VARS[_vars[addr].type_var]
+        return LENGTH_VARS[_TYPE_CODES[_types[addr[0]]]]
 
     @staticmethod
     def addr_get_params(addr):
-        return _vars[addr].params
+        mask = _params[addr[0]]
+        return [param for param in AVAILABLE_PARAMS if mask & (1 << param)]
+
+    @staticmethod
+    def addr_has_param(addr, param):
+        return bool(_params[addr[0]] & (1 << param))
 
     @staticmethod
     def _check_value_with_type(type_var: str, value):
+        return _make_validator(type_var)(value)
+
+
+def _write(slot, value):
+    global _seq
+    if hard_running[0] is not None and hard_running[0] == _thread.get_ident():
+        raise _HARD_WRITE_ERROR
+    with _write_lock:
+        irq_state = machine.disable_irq()
+        _seq = (_seq + 1) & _SEQ_MASK
+        _values[slot] = value
+        _last_update[slot] = utime.ticks_ms()
+        _seq = (_seq + 1) & _SEQ_MASK
+        machine.enable_irq(irq_state)
+    subscribers = _subscribers[slot]
+    if subscribers:
+        for subscriber in subscribers:
+            subscriber.triggered = True
+    if _params[slot] & (1 << SYNC_CONFIG):
+        # Файл запише _config_file_persist на ядрі 1, коли зміни припиняться
+        _config_dirty[1] = utime.ticks_ms()
+        _config_dirty[0] = 1
+
+
+def config_apply(values):
+    """
+    Застосовує налаштування {адреса (hex або int): значення} одним записом, без збереження у файл.
+    Спершу перевіряються всі значення, потім коректні записуються разом, тож читач з іншого ядра
+    не побачить частину старих і частину нових налаштувань.
+    Повертає список відхилених адрес
+    """
+    global _seq
+    rejected = []
+    accepted = []
+    mask = 1 << SYNC_CONFIG
+    for addr in values:
         try:
-            struct.pack(type_var, value)
+            if isinstance(addr, int):
+                slot = addr
+            else:
+                key = bytes.fromhex(addr)
+                # Адреса – рівно один байт, довші ключі не обрізаються
+                slot = key[0] if len(key) == 1 else -1
         except Exception:
-            return False
-        return True
-
-
-class _LocalVar:
-    type_var = None
-    value = None
-    min_value = None
-    max_value = None
-    params = list()
-    last_update = 0
-
-    def __init__(self, type_var, value, min_value, max_value, params):
-        self.type_var = type_var
-        self.value = value
-        self.min_value = min_value
-        self.max_value = max_value
-        self.params = params
-        self.last_update = utime.ticks_ms()
+            slot = -1
+        if not 0 <= slot < SLOTS:
+            rejected.append(addr)
+            continue
+        value = values[addr]
+        validator = _validators[slot]
+        if _params[slot] & mask and validator is not None and validator(value):
+            accepted.append((slot, value))
+        else:
+            rejected.append(addr)
+    now = utime.ticks_ms()
+    with _write_lock:
+        irq_state = machine.disable_irq()
+        _seq = (_seq + 1) & _SEQ_MASK
+        for slot, value in accepted:
+            _values[slot] = value
+            _last_update[slot] = now
+        _seq = (_seq + 1) & _SEQ_MASK
+        machine.enable_irq(irq_state)
+    for slot, _ in accepted:
+        subscribers = _subscribers[slot]
+        if subscribers:
+            for subscriber in subscribers:
+                subscriber.triggered = True
+    return rejected
 
 
 def config_file_load(controller):
     try:
-        global _vars
-        f = open(FILENAME_CONFIG, "r")
-        values = ujson.load(f)
-        f.close()
-        for addr in values:
-            try:
-                _addr = bytes.fromhex(addr)
-                var = Var(_addr)
-                if SYNC_CONFIG in var.get_params():
-                    var.set(values[addr])
-            except Exception as e:
-                logger.error(f'Error load var addr={addr}: {e}')
+        if _config_file is None:
+            return True
+        if _config_journal is not None:
+            values = _config_journal.load()
+            if _config_journal.corrupted:
+                logger.error(f'Skipped {_config_journal.corrupted} corrupted config records')
+        else:
+            f = open(_config_file, "r")
+            values = ujson.load(f)
+            f.close()
     except Exception as e:
         logger.error(f'Error read file')
+        return True
+    rejected = config_apply(values)
+    if rejected:
+        logger.error(f'Rejected {len(rejected)} of {len(values)} config values: {", ".join(str(addr) for addr in rejected)}')
     return True
 
 
 def config_file_save():
+    """
+    Записує SYNC_CONFIG одразу. JSON переписується через тимчасовий файл,
+    журнал дописує тільки змінені значення
+    """
+    if _config_file is None:
+        return
+    # Скидається до запису: зміна під час запису знову позначить налаштування
+    _config_dirty[0] = 0
+    try:
+        _config_file_write()
+    except Exception:
+        # Запис не вдався (наприклад, немає місця): повтор через CONFIG_SAVE_DELAY або при завершенні
+        _config_dirty[1] = utime.ticks_ms()
+        _config_dirty[0] = 1
+        raise
+
+
+def _config_file_write():
+    mask = 1 << SYNC_CONFIG
+    if _config_journal is not None:
+        entries = []
+        for slot in range(SLOTS):
+            if _types[slot] and _params[slot] & mask:
+                entries.append((slot, _TYPE_CODES[_types[slot]], _values[slot]))
+        _config_journal.save(entries)
+        return
     values = {}
-    for addr in _vars:
-        if SYNC_CONFIG in _vars[addr].params:
-            values[addr.hex()] = _vars[addr].value
-    f = open(FILENAME_CONFIG, "w")
-    ujson.dump(values, f)
-    f.close()
+    for slot in range(SLOTS):
+        if _types[slot] and _params[slot] & mask:
+            values[bytes((slot,)).hex()] = _values[slot]
+    replace_file(_config_file, ujson.dumps(values))
+
+
+def _config_file_persist(controller):
+    if _config_dirty[0] and utime.ticks_diff(utime.ticks_ms(), _config_dirty[1]) >= CONFIG_SAVE_DELAY:
+        try:
+            config_file_save()
+        except Exception as e:
+            logger.error(f'Error save config: {e}')
+
+
+def _config_file_flush(controller):
+    if _config_dirty[0]:
+        config_file_save()
 
 
-Startup(config_file_load)
+register_context(_bind_context)
+Startup(config_file_load, phase=PHASE_CONFIG)
+Update(_config_file_persist, DELAY_SLOW, thread=True, name='config_file_persist')
+Shutdown(_config_file_flush, thread=True)
@@ -0,0 +1,101 @@
+"""
+Пропускна здатність радіоканалу NRF24L01Communication у режимах 8-байтових та динамічних пакетів.
+
+    python host/bench_radio.py [--packets 1000] [--rate 200] [--data-rate 1]
+
+Передавач моделюється через devices.NRF24L01.receive(): кожен пакет несе керування (a0, a1),
+у відповідь приходить ACK з телеметрією Dashboard. Для кожного режиму виводиться кількість змінних
+за секунду при частоті пакетів --rate, байти в ефірі та час обробки пакета на комп'ютері
+"""
+import argparse
+import os
+import struct
+import time
+
+import runtime
+
+# Преамбула, адреса та CRC (байт) і поле керування пакета (біт) Enhanced ShockBurst
+AIR_OVERHEAD_BYTES = 1 + 5 + 2
+AIR_PCF_BITS = 9
+# Перемикання між прийомом і передачею (мкс)
+AIR_TURNAROUND = 130
+
+
+def airtime(payload, data_rate):
+    """
+    Тривалість пакета в ефірі (мкс), data_rate – Мбіт/с
+    """
+    return (8 * (AIR_OVERHEAD_BYTES + payload) + AIR_PCF_BITS) / data_rate
+
+
+def setup(data_rate):
+    import machine
+    import devices
+    from machine import Pin
+    from global_vars import Var
+    from parts.communication import NRF24L01Communication
+    # Змінні керування та телеметрії вбудованих модулів реєструються при імпорті
+    import parts.car
+
+    device = machine.attach_spi(Pin(8), devices.NRF24L01())
+    part = NRF24L01Communication(1, Pin(10), Pin(11), Pin(12), Pin(8), Pin(9))
+    Var(b'\xcc').set(data_rate)
+    part._startup(None)
+    part._configure(None)
+    return part, device
+
+
+def run_mode(part, device, packets, rate, data_rate):
+    from parts.communication.nrf24l01 import PAYLOAD_DYNAMIC
+
+    dynamic = part._mode == PAYLOAD_DYNAMIC
+    sent_before = sum(s['sent'] for s in part.get_telemetry_stats())
+    uplink = downlink = uplink_vars = 0
+    busy = 0
+    for i in range(packets):
+        # a0 та a1 – BYTE
+        packet = struct.pack('<BbBb', 0xa0, i % 200 - 100, 0xa1, 100 - i % 200)
+        ack = device.receive(packet)
+        start = time.perf_counter()
+        part._update(None)
+        busy += time.perf_counter() - start
+        uplink += len(packet) if dynamic else part._codec.length
+        downlink += len(ack) if ack else 0
+        uplink_vars += 2
+    downlink_vars = sum(s['sent'] for s in part.get_telemetry_stats()) - sent_before
+    exchange = airtime(uplink / packets, data_rate) + airtime(downlink / packets, data_rate) + 2 * AIR_TURNAROUND
+    return {
+        'mode': 'dynamic' if dynamic else 'static',
+        'vars/packet': (uplink_vars + downlink_vars) / packets,
+        'vars/s': (uplink_vars + downlink_vars) * rate / packets,
+        'telemetry vars/s': downlink_vars * rate / packets,
+        'bytes on air/packet': 2 * AIR_OVERHEAD_BYTES + (uplink + downlink) / packets,
+        'air us/packet': exchange,
+        'max vars/s': (uplink_vars + downlink_vars) / packets * 1000000 / exchange,
+        'host us/packet': busy * 1000000 / packets,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Radio throughput in static and dynamic payload modes')
+    parser.add_argument('--packets', type=int, default=1000)
+    parser.add_argument('--rate', type=int, default=200, help='packets per second from the transmitter')
+    parser.add_argument('--data-rate', type=int, default=1, choices=(1, 2), help='Mbps')
+    args = parser.parse_args(argv)
+
+    runtime.install(virtual=True, default_devices=False)
+    os.chdir(runtime.make_workdir())
+    part, device = setup(args.data_rate)
+
+    results = [run_mode(part, device, args.packets, args.rate, args.data_rate)]
+    # Передавач вмикає динамічні пакети записом змінної cb
+    device.receive(struct.pack('<Bi', 0xcb, 1))
+    part._update(None)
+    results.append(run_mode(part, device, args.packets, args.rate, args.data_rate))
+
+    for result in results:
+        print(' '.join(f'{key}={value:.1f}' if isinstance(value, float) else f'{key}={value}' for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
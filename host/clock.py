@@ -0,0 +1,78 @@
+"""
+Годинник симуляції.
+У звичайному режимі йде разом з реальним часом.
+У віртуальному режимі час іде реально, поки хоч один потік працює,
+а коли всі потоки-учасники сплять – одразу перескакує до найближчого пробудження.
+Так цикли контролера відпрацьовують хвилини роботи за секунди, не змінюючи порядку подій
+"""
+import threading
+import time
+
+
+class Clock:
+    virtual: bool = False
+
+    def __init__(self, virtual=False):
+        self.virtual = virtual
+        self._start = time.perf_counter_ns()
+        self._offset = 0
+        self._cond = threading.Condition()
+        # Головний потік – завжди учасник
+        self._participants = 1
+        # ident потоку -> час пробудження (нс)
+        self._sleeping = {}
+
+    def now_ns(self):
+        return time.perf_counter_ns() - self._start + self._offset
+
+    def now_us(self):
+        return self.now_ns() // 1000
+
+    def sleep_ns(self, ns):
+        if ns <= 0:
+            time.sleep(0)
+            return
+        if not self.virtual:
+            time.sleep(ns / 1000000000)
+            return
+        self.sleep_until_ns(self.now_ns() + ns)
+
+    def sleep_until_ns(self, target):
+        if not self.virtual:
+            self.sleep_ns(target - self.now_ns())
+            return
+        ident = threading.get_ident()
+        with self._cond:
+            self._sleeping[ident] = target
+            while True:
+                now = self.now_ns()
+                if now >= target:
+                    break
+                if len(self._sleeping) >= self._participants:
+                    # Всі учасники сплять – час перескакує до найближчого пробудження
+                    step = min(self._sleeping.values()) - now
+                    if step > 0:
+                        self._offset += step
+                    self._cond.notify_all()
+                    continue
+                self._cond.wait((target - now) / 1000000000)
+            del self._sleeping[ident]
+
+    def enter(self):
+        """
+        Новий потік-учасник (цикл thread1, таймер)
+        """
+        with self._cond:
+            self._participants += 1
+
+    def leave(self):
+        with self._cond:
+            self._participants -= 1
+            self._cond.notify_all()
+
+
+clock = Clock()
+
+
+def set_virtual(virtual):
+    clock.virtual = virtual
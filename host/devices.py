@@ -0,0 +1,178 @@
+"""
+Моделі зовнішніх пристроїв на шинах machine.SPI та machine.I2C
+"""
+import threading
+from collections import deque
+
+import machine
+
+
+class NRF24L01:
+    """
+    Модель nRF24L01+ на рівні регістрів і команд SPI.
+    Програма працює з нею через libs.nrf24l01 як із справжнім радіомодулем,
+    симуляція передає пакети через receive() (як віддалений передавач) і отримує ACK payload
+    """
+    FIFO_DEPTH = 3
+    # Регістри адрес довжиною address_length
+    _ADDR_REGS = (0x0A, 0x0B, 0x10)
+
+    def __init__(self, irq=None):
+        """
+        irq – номер або Pin виводу IRQ (активний низький рівень), None – без нього
+        """
+        self._irq = irq.id if isinstance(irq, machine.Pin) else irq
+        self._lock = threading.Lock()
+        self._regs = bytearray(0x20)
+        self._addrs = {0x0A: bytearray(b'\xe7' * 5), 0x0B: bytearray(b'\xc2' * 5), 0x10: bytearray(b'\xe7' * 5)}
+        for reg, value in (
+                (0x00, 0x08), (0x01, 0x3f), (0x02, 0x03), (0x03, 0x03), (0x04, 0x03), (0x05, 0x02),
+                (0x06, 0x0e), (0x0c, 0xc3), (0x0d, 0xc4), (0x0e, 0xc5), (0x0f, 0xc6),
+        ):
+            self._regs[reg] = value
+        self._flags = 0
+        # (pipe, payload)
+        self._rx = deque()
+        self._tx = deque()
+        self.received = 0
+        self.dropped = 0
+        if self._irq is not None:
+            machine.set_pin(self._irq, 1)
+
+    def _status(self):
+        pipe = self._rx[0][0] if self._rx else 7
+        return self._flags | pipe << 1 | (len(self._tx) >= self.FIFO_DEPTH)
+
+    def _fifo_status(self):
+        return (
+            (not self._rx)
+            | (len(self._rx) >= self.FIFO_DEPTH) << 1
+            | (not self._tx) << 4
+            | (len(self._tx) >= self.FIFO_DEPTH) << 5
+        )
+
+    def _update_irq(self):
+        if self._irq is None:
+            return
+        masked = self._regs[0x00] & 0x70
+        active = self._flags & ~masked & 0x70
+        machine.set_pin(self._irq, 0 if active else 1)
+
+    @property
+    def dynamic_payloads(self):
+        return bool(self._regs[0x1d] & 4)
+
+    def transfer(self, out, into):
+        with self._lock:
+            self._transfer(out, into)
+        self._update_irq()
+
+    def _transfer(self, out, into):
+        command = out[0]
+        into[0] = self._status()
+        size = len(out)
+        if command < 0x20:
+            reg = command & 0x1f
+            if reg in self._ADDR_REGS:
+                data = self._addrs[reg]
+            elif reg == 0x07:
+                data = bytes((self._status(), ))
+            elif reg == 0x17:
+                data = bytes((self._fifo_status(), ))
+            else:
+                data = self._regs[reg:reg + 1]
+            for i in range(1, size):
+                into[i] = data[i - 1] if i - 1 < len(data) else 0
+        elif command < 0x40:
+            reg = command & 0x1f
+            if reg in self._ADDR_REGS:
+                self._addrs[reg][:size - 1] = out[1:size]
+            elif reg == 0x07:
+                # Прапорці скидаються записом одиниці
+                self._flags &= ~out[1] & 0x70
+            elif size > 1:
+                self._regs[reg] = out[1]
+        elif command == 0x60:
+            if size > 1:
+                into[1] = len(self._rx[0][1]) if self._rx else 0
+        elif command == 0x61:
+            payload = self._rx.popleft()[1] if self._rx else b''
+            for i in range(1, size):
+                into[i] = payload[i - 1] if i - 1 < len(payload) else 0
+        elif command in (0xa0, 0xb0) or command & 0xf8 == 0xa8:
+            if len(self._tx) < self.FIFO_DEPTH:
+                pipe = command & 7 if command & 0xf8 == 0xa8 else 0
+                self._tx.append((pipe, bytes(out[1:size])))
+        elif command == 0xe1:
+            self._tx.clear()
+        elif command == 0xe2:
+            self._rx.clear()
+
+    def receive(self, payload, pipe=1):
+        """
+        Пакет від віддаленого передавача.
+        Повертає ACK payload для цього каналу (якщо ввімкнено), b'' – порожній ACK,
+        None – пакет не прийнято (модуль не слухає, канал закритий або RX FIFO повний)
+        """
+        with self._lock:
+            config = self._regs[0x00]
+            if config & 3 != 3 or not self._regs[0x02] & (1 << pipe):
+                return None
+            if len(self._rx) >= self.FIFO_DEPTH:
+                self.dropped += 1
+                return None
+            if self._regs[0x1c] & (1 << pipe) and self.dynamic_payloads:
+                data = bytes(payload[:32])
+            else:
+                length = self._regs[0x11 + pipe]
+                data = bytes(payload[:length]) + bytes(max(0, length - len(payload)))
+            self._rx.append((pipe, data))
+            self.received += 1
+            self._flags |= 0x40
+            ack = b''
+            if self._regs[0x1d] & 2:
+                for item in self._tx:
+                    if item[0] == pipe:
+                        self._tx.remove(item)
+                        ack = item[1]
+                        break
+        self._update_irq()
+        return ack
+
+
+class MPU6050:
+    """
+    Модель MPU6050 на I2C: регістри та значення датчиків, які задає симуляція
+    """
+    address = 0x68
+
+    def __init__(self, address=0x68):
+        self.address = address
+        self._regs = bytearray(128)
+        self._regs[0x75] = 0x68
+        self._regs[0x6b] = 0x40
+
+    def read(self, memaddr, buf):
+        for i in range(len(buf)):
+            buf[i] = self._regs[(memaddr + i) & 0x7f]
+
+    def write(self, memaddr, data):
+        for i in range(len(data)):
+            self._regs[(memaddr + i) & 0x7f] = data[i]
+
+    def _set_vector(self, reg, values, scale):
+        for i, value in enumerate(values):
+            raw = max(-32768, min(32767, int(value * scale)))
+            self._regs[reg + i * 2:reg + i * 2 + 2] = (raw & 0xffff).to_bytes(2, 'big')
+
+    def set_accel(self, x, y, z):
+        """
+        Прискорення в g з урахуванням поточного діапазону
+        """
+        self._set_vector(0x3b, (x, y, z), 16384 >> (self._regs[0x1c] >> 3 & 3))
+
+    def set_gyro(self, x, y, z):
+        """
+        Кутова швидкість у град/с з урахуванням поточного діапазону
+        """
+        self._set_vector(0x43, (x, y, z), 131 / (1 << (self._regs[0x1b] >> 3 & 3)))
@@ -0,0 +1,84 @@
+"""
+Багато моделей в одному процесі, які працюють по черзі (Controller.step).
+
+    python host/fleet.py fleet.py --count 100 --duration 10 [--virtual]
+
+fleet.py має функцію build(index), яка створює частини та повертає Controller.
+Кожна модель будується у своєму контексті (controller.context.Context),
+тож змінні та оновлення моделей не перетинаються.
+Моделі пристроїв machine спільні для всього процесу: однакові піни в різних моделях – це один пін
+"""
+import argparse
+import os
+import runpy
+import time
+
+import runtime
+
+
+def build_fleet(build, count):
+    from controller import Context
+
+    controllers = []
+    for index in range(count):
+        with Context():
+            controllers.append(build(index))
+    return controllers
+
+
+def run_fleet(controllers, duration):
+    """
+    Веде всі контролери протягом duration мкс за годинником симуляції.
+    Повертає кількість кроків
+    """
+    import utime
+
+    for controller in controllers:
+        controller.setup()
+    steps = 0
+    start = utime.ticks_us()
+    while utime.ticks_diff(utime.ticks_us(), start) < duration:
+        wait = None
+        for controller in controllers:
+            if not controller.is_running():
+                continue
+            step_wait = controller.step()
+            if wait is None or step_wait < wait:
+                wait = step_wait
+        if wait is None:
+            break
+        steps += 1
+        if wait > 0:
+            utime.sleep_us(wait)
+    for controller in controllers:
+        controller.teardown()
+    return steps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run many vehicles in lockstep')
+    parser.add_argument('script', help='file with build(index) returning a Controller')
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=1)
+    parser.add_argument('--virtual', action='store_true', help='virtual clock, idle time is skipped')
+    args = parser.parse_args(argv)
+
+    runtime.install(virtual=args.virtual)
+    # SYNC_CONFIG контексту за замовчуванням не повинен змінювати налаштування поруч зі скриптом
+    os.chdir(runtime.make_workdir())
+    build = runpy.run_path(os.path.abspath(args.script))['build']
+
+    controllers = build_fleet(build, args.count)
+    real_start = time.perf_counter()
+    steps = run_fleet(controllers, int(args.duration * 1000000))
+    real_elapsed = time.perf_counter() - real_start
+
+    calls = 0
+    for controller in controllers:
+        for stats in (controller.get_stats(), controller.get_stats(True)):
+            calls += sum(s['calls'] for s in stats)
+    print(f"controllers={len(controllers)} steps={steps} calls={calls} real {real_elapsed:.3f}s calls/s={calls / real_elapsed:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""
+machine для CPython: моделі Pin, PWM, ADC, SPI, I2C, Timer, WDT.
+Стан пінів спільний для всіх об'єктів Pin з тим самим номером.
+Пристрої на шинах – моделі з devices, підключаються через attach_spi/attach_i2c
+або створюються за замовчуванням фабриками spi_default/i2c_default
+"""
+import sys
+import threading
+
+from clock import clock
+
+
+# номер піна -> _PinState
+pins = {}
+# номер піна CS -> модель пристрою з методом transfer(out, into)
+spi_devices = {}
+# адреса -> модель пристрою з методами read(memaddr, buf) та write(memaddr, data)
+i2c_devices = {}
+# номер піна -> значення АЦП (u16)
+adc_values = {}
+
+# Фабрики пристроїв для шин без явно підключених моделей (див. host.runtime)
+spi_default = None
+i2c_default = None
+
+# Пін, який останнім встановили у 0 (вибір пристрою на SPI)
+_last_low = None
+
+_reset_cause = 0
+PWRON_RESET = 1
+WDT_RESET = 3
+
+
+class _PinState:
+    def __init__(self, id):
+        self.id = id
+        self.mode = -1
+        self.pull = -1
+        self.value = 0
+        self.handler = None
+        self.trigger = 0
+        self.pwm = None
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        if isinstance(id, Pin):
+            id = id.id
+        self.id = id
+        self._state = pins.get(id)
+        if self._state is None:
+            self._state = pins[id] = _PinState(id)
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self._state.mode = mode
+        if pull != -1:
+            self._state.pull = pull
+            if pull == Pin.PULL_UP:
+                self._state.value = 1
+        if value is not None:
+            self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            return self._state.value
+        set_pin(self.id, 1 if value else 0)
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._state.handler = handler
+        self._state.trigger = trigger if handler is not None else 0
+
+    def __repr__(self):
+        return f'Pin({self.id})'
+
+
+def set_pin(id, value):
+    """
+    Змінює рівень піна з боку симуляції (вхід) або програми (вихід)
+    і викликає обробник переривання, якщо фронт збігається з trigger
+    """
+    global _last_low
+    state = pins.get(id)
+    if state is None:
+        state = pins[id] = _PinState(id)
+    old = state.value
+    state.value = value
+    if not value:
+        _last_low = id
+    if state.handler is not None and old != value:
+        edge = Pin.IRQ_RISING if value else Pin.IRQ_FALLING
+        if state.trigger & edge:
+            state.handler(Pin(id))
+
+
+class PWM:
+    def __init__(self, pin, freq=0, duty_u16=0):
+        self._pin = pin if isinstance(pin, Pin) else Pin(pin)
+        self._freq = freq
+        self._duty = duty_u16
+        self._pin._state.pwm = self
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+
+    def duty_ns(self, value=None):
+        if value is None:
+            return self._duty * 1000000000 // 65535 // self._freq if self._freq else 0
+        self._duty = value * self._freq * 65535 // 1000000000
+
+    def deinit(self):
+        self._pin._state.pwm = None
+
+
+class ADC:
+    CORE_TEMP = 4
+
+    def __init__(self, pin):
+        self._id = pin.id if isinstance(pin, Pin) else pin
+
+    def read_u16(self):
+        return adc_values.get(self._id, 0)
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id=0, baudrate=1000000, *, polarity=0, phase=0, bits=8, firstbit=MSB, sck=None, mosi=None, miso=None):
+        self.id = id
+        self.baudrate = baudrate
+
+    def init(self, baudrate=1000000, *, polarity=0, phase=0, bits=8, firstbit=MSB, **kwargs):
+        self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def _device(self):
+        for cs in spi_devices:
+            if not pins[cs].value:
+                return spi_devices[cs]
+        if spi_default is not None and _last_low is not None and _last_low not in spi_devices:
+            device = spi_devices[_last_low] = spi_default()
+            return device
+        return None
+
+    def write_readinto(self, write_buf, read_buf):
+        device = self._device()
+        if device is None:
+            for i in range(len(read_buf)):
+                read_buf[i] = 0xff
+            return
+        device.transfer(write_buf, read_buf)
+
+    def write(self, buf):
+        self.write_readinto(buf, bytearray(len(buf)))
+
+    def readinto(self, buf, write=0x00):
+        self.write_readinto(bytes([write]) * len(buf), buf)
+
+    def read(self, nbytes, write=0x00):
+        buf = bytearray(nbytes)
+        self.readinto(buf, write)
+        return bytes(buf)
+
+
+class I2C:
+    def __init__(self, id=0, *, scl=None, sda=None, freq=400000):
+        self.id = id
+        if i2c_default is not None and not i2c_devices:
+            device = i2c_default()
+            i2c_devices[device.address] = device
+
+    def scan(self):
+        return sorted(i2c_devices)
+
+    def _device(self, addr):
+        device = i2c_devices.get(addr)
+        if device is None:
+            raise OSError(5)
+        return device
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        self._device(addr).read(memaddr, buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self._device(addr).write(memaddr, buf)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._generation = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, mode=PERIODIC, freq=-1, period=-1, tick_hz=1000, callback=None):
+        self.deinit()
+        if freq > 0:
+            period_ns = int(1000000000 / freq)
+        else:
+            period_ns = int(period * 1000000000 / tick_hz)
+        generation = self._generation
+
+        def run():
+            try:
+                due = clock.now_ns() + period_ns
+                while generation == self._generation:
+                    clock.sleep_until_ns(due)
+                    if generation != self._generation:
+                        break
+                    callback(self)
+                    if mode == Timer.ONE_SHOT:
+                        break
+                    due += period_ns
+            finally:
+                clock.leave()
+
+        clock.enter()
+        threading.Thread(target=run, daemon=True).start()
+
+    def deinit(self):
+        self._generation += 1
+
+
+class WDT:
+    """
+    Не перезапускає процес, а повідомляє про спрацювання, яке сталося б на платі
+    """
+    expired = False
+
+    def __init__(self, id=0, timeout=5000):
+        self._timeout = timeout * 1000000
+        self._fed = clock.now_ns()
+
+    def feed(self):
+        now = clock.now_ns()
+        if now - self._fed > self._timeout and not self.expired:
+            self.expired = True
+            sys.stderr.write(f"WDT expired: not fed for {(now - self._fed) // 1000000}ms\n")
+        self._fed = now
+
+
+def attach_spi(cs, device):
+    spi_devices[cs.id if isinstance(cs, Pin) else cs] = device
+    return device
+
+
+def attach_i2c(device):
+    i2c_devices[device.address] = device
+    return device
+
+
+def set_adc(pin, value):
+    adc_values[pin.id if isinstance(pin, Pin) else pin] = value
+
+
+def freq(hz=None):
+    return 125000000
+
+
+def unique_id():
+    return b'\x00host\x00\x00\x00'
+
+
+def reset_cause():
+    return _reset_cause or PWRON_RESET
+
+
+def reset():
+    raise SystemExit('machine.reset()')
+
+
+def soft_reset():
+    reset()
+
+
+def idle():
+    clock.sleep_ns(0)
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
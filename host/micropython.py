@@ -0,0 +1,49 @@
+"""
+micropython для CPython.
+schedule виконує функцію одразу у потоці, що її запланував (таймер, обробник переривання).
+heap_lock лише рахує вкладеність: виділення пам'яті на хості не блокується
+"""
+_heap_locked = 0
+
+
+def const(value):
+    return value
+
+
+def native(function):
+    return function
+
+
+viper = native
+
+
+def schedule(function, arg):
+    function(arg)
+
+
+def heap_lock():
+    global _heap_locked
+    _heap_locked += 1
+
+
+def heap_unlock():
+    global _heap_locked
+    _heap_locked -= 1
+    return _heap_locked
+
+
+def heap_locked():
+    return _heap_locked
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    import gc
+    print(f"allocated: {gc.mem_alloc()} free: {gc.mem_free()}")
+
+
+def opt_level(level=None):
+    return 0
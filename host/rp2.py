@@ -0,0 +1,80 @@
+"""
+rp2 для CPython.
+PIO-програми не виконуються: asm_pio лише повертає функцію, а StateMachine – це FIFO,
+які симуляція наповнює через push() (RX FIFO), а програма читає через get()
+"""
+from collections import deque
+
+
+# номер автомата -> StateMachine
+state_machines = {}
+
+
+class PIO:
+    IN_LOW = 0
+    IN_HIGH = 1
+    OUT_LOW = 2
+    OUT_HIGH = 3
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+
+def asm_pio(*args, **kwargs):
+    def decorator(program):
+        return program
+    return decorator
+
+
+class StateMachine:
+    FIFO_DEPTH = 4
+
+    def __init__(self, id, program=None, freq=-1, **kwargs):
+        self.id = id
+        self.program = program
+        self._active = 0
+        self._rx = deque()
+        self._tx = deque()
+        state_machines[id] = self
+
+    def init(self, program, freq=-1, **kwargs):
+        self.program = program
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = 1 if value else 0
+
+    def restart(self):
+        self._rx.clear()
+        self._tx.clear()
+
+    def exec(self, instr):
+        pass
+
+    def rx_fifo(self):
+        return len(self._rx)
+
+    def tx_fifo(self):
+        return len(self._tx)
+
+    def get(self, buf=None, shift=0):
+        if not self._rx:
+            return 0
+        return self._rx.popleft() >> shift
+
+    def put(self, value, shift=0):
+        if len(self._tx) < self.FIFO_DEPTH:
+            self._tx.append(value << shift)
+
+    def push(self, value):
+        """
+        Запис у RX FIFO з боку симуляції, як push(noblock): при повному FIFO значення губиться
+        """
+        if len(self._rx) < self.FIFO_DEPTH:
+            self._rx.append(value & 0xffffffff)
+
+    def irq(self, handler=None, trigger=0, hard=False):
+        pass
@@ -0,0 +1,95 @@
+"""
+Запуск опису моделі (main.py) на CPython без плати.
+
+    python host/run.py [main.py] [--virtual] [--duration 10] [--setup scenario.py] [--trace-alloc]
+
+Після зупинки контролера виводить статистику оновлень обох циклів і жорсткого рівня.
+Робоча тека за замовчуванням – тимчасова копія з config.json поруч зі скриптом,
+тож налаштування у репозиторії не змінюються
+"""
+import argparse
+import os
+import runpy
+import sys
+import time
+
+import runtime
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run a vehicle definition on CPython')
+    parser.add_argument('script', nargs='?', default=os.path.join(runtime.ROOT_DIR, 'main.py'))
+    parser.add_argument('--virtual', action='store_true', help='virtual clock, idle time is skipped')
+    parser.add_argument('--duration', type=float, default=0, help='stop controllers after N seconds of clock time')
+    parser.add_argument('--setup', action='append', default=[], help='script run before the vehicle definition')
+    parser.add_argument('--workdir', help='working directory with config.json')
+    parser.add_argument('--trace-alloc', action='store_true', help='count allocations for gc.mem_alloc')
+    parser.add_argument('--no-devices', action='store_true', help='no default nRF24L01/MPU6050 models')
+    return parser.parse_args(argv)
+
+
+def print_stats(controllers, clock_elapsed, real_elapsed):
+    import gc
+
+    print(f"clock {clock_elapsed / 1000000000:.3f}s real {real_elapsed:.3f}s mem_alloc={gc.mem_alloc()}")
+    for n, controller in enumerate(controllers):
+        groups = (
+            ('thread0', controller.get_stats()),
+            ('thread1', controller.get_stats(True)),
+            ('hard', controller.get_hard_stats()),
+        )
+        for group, stats in groups:
+            for s in stats:
+                rate = s['calls'] * 1000000000 / clock_elapsed if clock_elapsed else 0
+                print(
+                    f"controller{n} {group:<8} {s['name']:<40} calls={s['calls']} rate={rate:.1f}/s "
+                    f"time={s['time_min']}/{s['time_mean']}/{s['time_max']}us "
+                    f"lag={s['lag_mean']}/{s['lag_max']}us missed={s['missed']}"
+                )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    script = os.path.abspath(args.script)
+    runtime.install(virtual=args.virtual, trace_alloc=args.trace_alloc, default_devices=not args.no_devices)
+
+    os.chdir(args.workdir or runtime.make_workdir(os.path.dirname(script)))
+    sys.path.insert(1, os.path.dirname(script))
+
+    import _thread
+    from controller import Controller
+    from clock import clock
+
+    controllers = []
+    start = Controller.start
+
+    def start_recorded(self, *a, **kw):
+        controllers.append(self)
+        return start(self, *a, **kw)
+
+    Controller.start = start_recorded
+
+    if args.duration:
+        def stop_after():
+            clock.sleep_ns(int(args.duration * 1000000000))
+            for controller in controllers:
+                controller.stop()
+
+        _thread.start_new_thread(stop_after, ())
+
+    for setup in args.setup:
+        runpy.run_path(os.path.abspath(setup), run_name='__setup__')
+
+    clock_start = clock.now_ns()
+    real_start = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except KeyboardInterrupt:
+        for controller in controllers:
+            controller.stop()
+    _thread.join_all()
+    print_stats(controllers, clock.now_ns() - clock_start, time.perf_counter() - real_start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Підготовка CPython до запуску коду контролера.
+Модулі-замінники (machine, utime, rp2, ujson, micropython, uasyncio) лежать у цій теці,
+_thread та gc підміняються через sys.modules, бо у CPython вони вбудовані
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(HOST_DIR)
+
+# Стандартні asyncio та threading імпортуються до того, як у шляхах з'явиться корінь репозиторію:
+# вони тягнуть стандартний logging, а пакет logging репозиторію його перекриває
+_path = sys.path[:]
+sys.path[:] = [i for i in sys.path if os.path.abspath(i or '.') != ROOT_DIR]
+import asyncio
+import threading
+sys.path[:] = _path
+
+if HOST_DIR not in sys.path:
+    sys.path.insert(0, HOST_DIR)
+
+from clock import clock
+import devices
+import machine
+import sim_gc
+import sim_thread
+
+
+def install(virtual=False, trace_alloc=False, default_devices=True):
+    """
+    virtual – віртуальний годинник (див. clock)
+    trace_alloc – рахувати виділення пам'яті для gc.mem_alloc
+    default_devices – nRF24L01 на кожному SPI та MPU6050 на кожній I2C, якщо не підключено інших
+    """
+    logging = sys.modules.get('logging')
+    if logging is not None and not logging.__file__.startswith(ROOT_DIR):
+        del sys.modules['logging']
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(1, ROOT_DIR)
+    sys.modules['_thread'] = sim_thread
+    sys.modules['gc'] = sim_gc
+    clock.virtual = virtual
+    if trace_alloc:
+        sim_gc.start_trace()
+    if default_devices:
+        machine.spi_default = devices.NRF24L01
+        machine.i2c_default = devices.MPU6050
+
+
+def make_workdir(source_dir=ROOT_DIR):
+    """
+    Тимчасова робоча тека з копією config.json із source_dir,
+    щоб запис налаштувань не змінював файл у репозиторії
+    """
+    workdir = tempfile.mkdtemp(prefix='fsecu-')
+    config = os.path.join(source_dir, 'config.json')
+    if os.path.exists(config):
+        shutil.copy(config, workdir)
+    return workdir
@@ -0,0 +1,51 @@
+"""
+gc для CPython з mem_alloc/mem_free як у MicroPython.
+Пам'ять рахується через tracemalloc (start_trace).
+CPython звільняє об'єкти одразу, тому тимчасові виділення між двома викликами mem_alloc
+додаються як сміття (пік мінус поточне) і зникають тільки після collect(),
+як у купі MicroPython. Числа наближені і показують виділення на хості, а не на RP2040
+"""
+from gc import *
+import gc as _gc
+import tracemalloc
+
+
+# Об'єкти CPython значно більші, ніж у MicroPython, тож розмір купи RP2040 тут не має сенсу:
+# купа умовно велика, а mem_free лише зменшується разом з mem_alloc
+HEAP_SIZE = 64 * 1024 * 1024
+
+_threshold = -1
+_garbage = 0
+
+
+def start_trace():
+    tracemalloc.start()
+
+
+def collect():
+    global _garbage
+    _garbage = 0
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    return _gc.collect()
+
+
+def mem_alloc():
+    global _garbage
+    if not tracemalloc.is_tracing():
+        return 0
+    current, peak = tracemalloc.get_traced_memory()
+    _garbage += peak - current
+    tracemalloc.reset_peak()
+    return current + _garbage
+
+
+def mem_free():
+    return max(0, HEAP_SIZE - mem_alloc())
+
+
+def threshold(amount=None):
+    global _threshold
+    if amount is None:
+        return _threshold
+    _threshold = amount
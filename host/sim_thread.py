@@ -0,0 +1,44 @@
+"""
+_thread для CPython: потоки стають учасниками годинника симуляції (див. clock)
+"""
+from _thread import allocate_lock, get_ident, exit, LockType
+import _thread
+import time
+
+from clock import clock
+
+
+_running = 0
+_running_lock = _thread.allocate_lock()
+
+
+def start_new_thread(function, args, kwargs=None):
+    global _running
+
+    def run():
+        global _running
+        try:
+            function(*args, **(kwargs or {}))
+        finally:
+            with _running_lock:
+                _running -= 1
+            clock.leave()
+
+    with _running_lock:
+        _running += 1
+    clock.enter()
+    return _thread.start_new_thread(run, ())
+
+
+def stack_size(size=0):
+    return 0
+
+
+def join_all(timeout=5):
+    """
+    Чекає (у реальному часі) завершення потоків, запущених через start_new_thread
+    """
+    end = time.monotonic() + timeout
+    while _running and time.monotonic() < end:
+        time.sleep(0.01)
+    return not _running
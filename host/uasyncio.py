@@ -0,0 +1,9 @@
+"""
+uasyncio для CPython.
+Очікування йдуть у реальному часі, віртуальний годинник на асинхронний режим не поширюється
+"""
+from asyncio import *
+
+
+async def sleep_ms(ms):
+    await sleep(ms / 1000)
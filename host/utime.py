@@ -0,0 +1,50 @@
+"""
+utime для CPython поверх годинника симуляції
+"""
+from clock import clock
+
+
+TICKS_PERIOD = 1 << 30
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+def ticks_us():
+    return clock.now_us() & _TICKS_MAX
+
+
+def ticks_ms():
+    return clock.now_ns() // 1000000 & _TICKS_MAX
+
+
+# На RP2040 ticks_cpu має роздільність 1 мкс
+ticks_cpu = ticks_us
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    return diff - TICKS_PERIOD if diff >= _TICKS_HALFPERIOD else diff
+
+
+def time():
+    return clock.now_ns() // 1000000000
+
+
+def time_ns():
+    return clock.now_ns()
+
+
+def sleep(seconds):
+    clock.sleep_ns(int(seconds * 1000000000))
+
+
+def sleep_ms(ms):
+    clock.sleep_ns(int(ms) * 1000000)
+
+
+def sleep_us(us):
+    clock.sleep_ns(int(us) * 1000)
@@ -65,6 +65,9 @@ class RF24:
     ):
         self._in = bytearray(97)  # MISO buffer for full RX FIFO reads + STATUS byte
         self._out = bytearray(97)  # MOSI buffer length must equal MISO buffer length
+        # views for SPI transfers without copying the buffers
+        self._in_mv = memoryview(self._in)
+        self._out_mv = memoryview(self._out)
 
         ce_pin.init(machine.Pin.OUT, value=0)
         csn.init(machine.Pin.OUT, value=1)
@@ -102,6 +105,8 @@ class RF24:
         #   5 = enable dynamic_payloads, disable custom ack payloads, &
         #       allow ask_no_ack command
         self._features = 5
+        # set by read_all() when the RX FIFO still holds payloads
+        self.rx_more = False
         # init shadow copy of last RX_ADDR_P0 written to pipe 0 needed as
         # open_tx_pipe() appropriates pipe 0 for ACK packet
         self._pipe0_read_addr: Optional[Union[bytes, bytearray]] = None
@@ -164,11 +169,9 @@ class RF24:
     def write_readinto(self, in_end: int = None, out_end: int = None):
         out_end = out_end if out_end is not None else len(self._out)
         in_end = in_end if in_end is not None else len(self._in)
-        _in = self._in[:in_end]
         self._csn.value(0)
-        self._spi.write_readinto(self._out[:out_end], _in)
+        self._spi.write_readinto(self._out_mv[:out_end], self._in_mv[:in_end])
         self._csn.value(1)
-        self._in[:in_end] = _in
 
 
     def _reg_read(self, reg: int) -> int:
@@ -313,6 +316,46 @@ class RF24:
         self.clear_status_flags(True, False, False)
         return result
 
+    def read_all(self, buffers: Sequence[bytearray], lengths: bytearray) -> int:
+        """Drain the RX FIFO into preallocated ``buffers`` (32 bytes each) in
+        arrival order, storing payload lengths in ``lengths``. Returns the
+        number of payloads read.
+
+        Per payload this takes one R_RX_PL_WID (dynamic payloads) or NOP
+        (static payloads) transaction, which also returns STATUS, and one
+        R_RX_PAYLOAD transaction; then one more probe finds the FIFO empty and
+        a single STATUS write clears RX_DR for the whole batch. If a payload
+        arrived after the last probe, `rx_more` is set."""
+        dynamic = self._features & 4
+        count = 0
+        self.rx_more = False
+        while True:
+            if dynamic:
+                self._reg_read(0x60)
+            else:
+                self._reg_write(0xFF)
+            pipe = self._in[0] >> 1 & 7
+            if pipe > 5:
+                break
+            if count == len(buffers):
+                self.rx_more = True
+                break
+            length = self._in[1] if dynamic else self._pl_len[pipe]
+            if length > 32:
+                # corrupted dynamic payload width, per datasheet flush it
+                self.flush_rx()
+                break
+            self._out[0] = 0x61
+            self.write_readinto(out_end=length + 1, in_end=length + 1)
+            buffers[count][:length] = self._in_mv[1:length + 1]
+            lengths[count] = length
+            count += 1
+        if count:
+            self._reg_write(7, 0x40)
+            if self._in[0] >> 1 & 7 < 6:
+                self.rx_more = True
+        return count
+
     def send(
         self,
         buf: Union[bytes, bytearray, Sequence[Union[bytes, bytearray]]],
@@ -89,7 +89,7 @@ class Dashboard(BasePart):
         self._set_vars()
 
     def _set_vars(self):
-        self._mileage_var.set(self.get_mileage())
+        self._mileage_var.set_unchecked(self.get_mileage())
         self._speed_var.set(int(self.get_speed()*10))
         self._battery_percent_var.set(int(self.get_battery_percent()))
         self._battery_voltage_var.set(int(self.get_battery_voltage() * 10))
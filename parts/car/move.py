@@ -2,7 +2,7 @@ import utime
 from ..base import BasePart
 from global_vars import Var, BYTE, SYNC_CONFIG, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV
 from drivers import DriverMotor
-from controller import Controller, DELAY_FAST
+from controller import Controller, DELAY_NORMAL
 
 
 class Move(BasePart):
@@ -10,11 +10,13 @@ class Move(BasePart):
     Модуль для керування рухом.
     Використовується для транспорту з єдиним мотором
     """
-    delay_update = DELAY_FAST
+    # Нова команда запускає оновлення одразу, без неї вистачає рідшої перевірки таймауту
+    delay_update = DELAY_NORMAL
 
     _motor: DriverMotor
 
     _move = Var(b'\xa1', BYTE, 0, -100, 100, params=(COMMUNICATION_RECV, ))
+    update_triggers = (_move, )
 
     _quadratic_control = Var(b'\xd9', float, 1, 0, 1, params=(SYNC_CONFIG, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV))
 
@@ -31,8 +33,9 @@ class Move(BasePart):
         self._motor = motor
 
     def _update(self, controller: Controller):
-        move = self._get_value(self._move.get() / 100)
-        if utime.ticks_diff(utime.ticks_ms(), self._move.get_last_update()) > self._delay_control:
+        move, last_update = self._move.get_with_last_update()
+        move = self._get_value(move / 100)
+        if utime.ticks_diff(utime.ticks_ms(), last_update) > self._delay_control:
             to_motor_value = 0
         else:
             to_motor_value = move
@@ -1,7 +1,7 @@
 from ..base import BasePart
 from global_vars import Var, BYTE, SYNC_CONFIG, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV
 from drivers import DriverGyro, DriverPWMServo, DriverDirectionEncoder
-from controller import Controller, DELAY_FAST
+from controller import Controller, Dependency, DELAY_FAST
 from .dashboard import Dashboard
 
 
@@ -11,7 +11,10 @@ class Turn(BasePart):
     Використовується для класичного транспорту з єдиною поворотною вісю
     """
     delay_update = DELAY_FAST
+    # Стабілізації потрібен сталий період оновлення
+    fixed_rate = True
     _turn = Var(b'\xa0', BYTE, 0, -100, 100, params=(COMMUNICATION_RECV, ))
+    update_triggers = (_turn, )
 
     _left_servo_position = Var(b'\xd0', float, 0, 0, 1, params=(SYNC_CONFIG, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV))
     _null_servo_position = Var(b'\xd1', float, 0.5, 0, 1, params=(SYNC_CONFIG, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV))
@@ -25,6 +28,7 @@ class Turn(BasePart):
     _servo: DriverPWMServo
     _gyro: DriverGyro
     _direction_encoder: DriverDirectionEncoder
+    _dashboard: Dashboard = Dependency(Dashboard)
 
     __turn_coefficient: float = 0
 
@@ -40,7 +44,7 @@ class Turn(BasePart):
         self._direction_encoder = direction_encoder
 
     def _update(self, controller: Controller):
-        dashboard: Dashboard = controller.get_part(Dashboard)
+        dashboard = self._dashboard
         turn = self._get_correct_turn(self._turn.get() / 100)
         degrees_second = 0
         speed_coefficient = 0
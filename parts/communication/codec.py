@@ -0,0 +1,173 @@
+import struct
+
+from global_vars import Var, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV
+
+
+# Адреса в пакеті, за якою йде адреса змінної, яку передавач просить надіслати
+ADDR_REQUEST = 0xCF
+# Заповнення до довжини пакета
+ADDR_EMPTY = 0x00
+# Найбільший пакет nRF24L01
+PAYLOAD_MAX = 32
+
+_FLAG_RECV = 1
+_FLAG_REQUEST = 2
+
+# Як розбирати значення: цілі збираються з байтів без виділення пам'яті, решта – через struct
+_KIND_UNSIGNED = 0
+_KIND_SIGNED = 1
+_KIND_STRUCT = 2
+
+
+class PacketCodec:
+    """
+    Кодування пакетів радіо: [адреса][значення] ..., заповнення нулями до довжини пакета.
+    Таблиці розміру, формату та дозволів для кожної адреси збираються один раз зі змінних global_vars,
+    розбір пакетів накопичує значення, apply() записує у змінні останнє значення кожної адреси,
+    а ACK пакується у заздалегідь виділений буфер
+    """
+    packets: int = 0
+    errors: int = 0
+    rejected: int = 0
+    # Значення, замінені новішими з наступних пакетів до apply()
+    stale: int = 0
+
+    def __init__(self, length):
+        """
+        length – довжина пакета, можна змінювати між пакетами (не більше PAYLOAD_MAX)
+        """
+        self.length = length
+        self.buffer = bytearray(PAYLOAD_MAX)
+        self._view = memoryview(self.buffer)
+        self._offset = 0
+        self._vars = [None] * 256
+        # Розмір значення (байт), 0 – адреса невідома
+        self._sizes = bytearray(256)
+        self._kinds = bytearray(256)
+        self._formats = [None] * 256
+        self._flags = bytearray(256)
+        # Розібрані, але ще не записані значення та їх адреси в порядку появи
+        self._pending = [None] * 256
+        self._pending_slots = bytearray(256)
+        self._pending_count = 0
+        for var in Var.get_vars([]):
+            slot = var.get_addr()[0]
+            type_var = var.get_type_var()
+            self._vars[slot] = var
+            self._formats[slot] = '<' + type_var
+            self._sizes[slot] = struct.calcsize(self._formats[slot])
+            if type_var in 'bhil':
+                self._kinds[slot] = _KIND_SIGNED
+            elif type_var in 'BH':
+                self._kinds[slot] = _KIND_UNSIGNED
+            else:
+                self._kinds[slot] = _KIND_STRUCT
+            flags = 0
+            if var.has_param(COMMUNICATION_RECV):
+                flags |= _FLAG_RECV
+            if var.has_param(COMMUNICATION_REQUEST_SEND):
+                flags |= _FLAG_REQUEST
+            self._flags[slot] = flags
+        # Запит надсилання змінної завжди займає один байт
+        self._sizes[ADDR_REQUEST] = 1
+        self._kinds[ADDR_REQUEST] = _KIND_UNSIGNED
+
+    def decode(self, package, requests, length=None):
+        """
+        Розбирає значення змінних з COMMUNICATION_RECV до apply(),
+        адреси запитаних змінних з COMMUNICATION_REQUEST_SEND додає у requests.
+        length – довжина даних у package, якщо буфер довший.
+        Повертає кількість розібраних значень
+        """
+        self.packets += 1
+        sizes = self._sizes
+        kinds = self._kinds
+        pending = self._pending
+        end = len(package) if length is None else length
+        if end > self.length:
+            end = self.length
+        offset = 0
+        count = 0
+        while offset < end:
+            slot = package[offset]
+            offset += 1
+            if slot == ADDR_EMPTY:
+                continue
+            size = sizes[slot]
+            if not size or offset + size > end:
+                # Довжина значення невідома, решту пакета не розібрати
+                self.errors += 1
+                return count
+            kind = kinds[slot]
+            if kind == _KIND_STRUCT:
+                value = struct.unpack_from(self._formats[slot], package, offset)[0]
+            else:
+                value = 0
+                i = offset + size
+                while i > offset:
+                    i -= 1
+                    value = (value << 8) | package[i]
+                if kind == _KIND_SIGNED and value >> (8 * size - 1):
+                    value -= 1 << (8 * size)
+            offset += size
+            if slot == ADDR_REQUEST:
+                if self._flags[value] & _FLAG_REQUEST:
+                    requests.append(value)
+            elif self._flags[slot] & _FLAG_RECV:
+                if pending[slot] is None:
+                    self._pending_slots[self._pending_count] = slot
+                    self._pending_count += 1
+                else:
+                    self.stale += 1
+                pending[slot] = value
+                count += 1
+        return count
+
+    def apply(self):
+        """
+        Записує у змінні розібрані значення, для кожної адреси – тільки останнє.
+        Повертає кількість прийнятих значень
+        """
+        pending = self._pending
+        count = 0
+        for i in range(self._pending_count):
+            slot = self._pending_slots[i]
+            value = pending[slot]
+            pending[slot] = None
+            try:
+                self._vars[slot].set(value)
+                count += 1
+            except ValueError:
+                self.rejected += 1
+        self._pending_count = 0
+        return count
+
+    def pack_start(self):
+        self._offset = 0
+
+    def pack(self, slot):
+        """
+        Додає змінну в ACK. False – значення не вміщується
+        """
+        offset = self._offset
+        end = offset + 1 + self._sizes[slot]
+        if end > self.length:
+            return False
+        self.buffer[offset] = slot
+        struct.pack_into(self._formats[slot], self.buffer, offset + 1, self._vars[slot].get())
+        self._offset = end
+        return True
+
+    def pack_end(self, dynamic=False):
+        """
+        Повертає ACK: заповнений нулями до length або, якщо dynamic, тільки запаковані байти (щонайменше один)
+        """
+        buffer = self.buffer
+        if dynamic:
+            if not self._offset:
+                buffer[0] = ADDR_EMPTY
+                return self._view[:1]
+            return self._view[:self._offset]
+        for i in range(self._offset, self.length):
+            buffer[i] = ADDR_EMPTY
+        return self._view[:self.length]
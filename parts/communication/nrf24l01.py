@@ -1,27 +1,64 @@
-import struct
-
-from controller import DELAY_FAST, Controller
+from controller import DELAY_FAST, DELAY_SLOW, Controller, Startup, Trigger, PHASE_PROBE, PHASE_CALIBRATE
+from controller.recording import Input, INPUT_RADIO, MODE_RECORD, MODE_REPLAY, get_mode
 from libs.nrf24l01 import *
 from machine import SPI, Pin
 from ..base import BasePart
-from global_vars import Var, SYNC_CONFIG, COMMUNICATION_ALLWAYS_SEND, COMMUNICATION_REQUEST_SEND, COMMUNICATION_RECV
+from .codec import PacketCodec, PAYLOAD_MAX
+from .telemetry import TelemetryScheduler
+from global_vars import Var, SYNC_CONFIG, COMMUNICATION_ALLWAYS_SEND, COMMUNICATION_RECV
 from logging import getLogger
 
 logger = getLogger('nrf21l01')
 
+# Режим пакетів: PAYLOAD_STATIC – 8 байт, як у старих передавачів,
+# PAYLOAD_DYNAMIC – динамічна довжина до 32 байт, ACK має довжину даних, що чекають надсилання.
+# Передавач вмикає PAYLOAD_DYNAMIC записом змінної cb. Режим не зберігається в налаштуваннях:
+# після перезапуску завжди PAYLOAD_STATIC, і передавач домовляється знову
+PAYLOAD_STATIC = 0
+PAYLOAD_DYNAMIC = 1
+PAYLOAD_STATIC_LENGTH = 8
+# Скільки мс без пакетів у режимі PAYLOAD_DYNAMIC до повернення до PAYLOAD_STATIC
+PAYLOAD_FALLBACK = 1000
+# З виводом IRQ оновлення запускає переривання, а опитування модуля лишається тільки про всяк випадок
+# (пропущений фронт) з цим періодом (мкс)
+IRQ_POLL = DELAY_SLOW
+# Глибина RX FIFO модуля: стільки пакетів може чекати між оновленнями
+RX_FIFO_DEPTH = 3
+
 
 class NRF24L01Communication(BasePart):
     delay_update = DELAY_FAST
     thread = True
+    # Ініціалізація модуля не залежить від налаштувань і йде одночасно з їх завантаженням
+    startup_phase = PHASE_PROBE
     nrf: RF24
+    # Прийнято пакетів, оновлень з кількома пакетами у FIFO (затримка обробки)
+    # та значень, замінених новішими з того ж оновлення
+    rx_packets: int = 0
+    rx_backlog: int = 0
+    # Частота (Гц) та пріоритет змінних COMMUNICATION_ALLWAYS_SEND: {адреса: (частота, пріоритет)},
+    # див. TelemetryScheduler
+    telemetry: dict = {}
 
     _channel = Var(b'\xcf', int, 1, 0, 125, params=(SYNC_CONFIG, ))
     _pipe = Var(b'\xce', int, 1000, params=(SYNC_CONFIG, ))
     _pa_level = Var(b'\xcd', int, 0, params=(SYNC_CONFIG, ))
     _data_rate = Var(b'\xcc', int, 0, params=(SYNC_CONFIG, ))
-
-    def __init__(self, spi_id: int, sck: Pin, mosi: Pin, miso: Pin, csn: Pin, ce: Pin):
+    _payload_mode = Var(b'\xcb', int, PAYLOAD_STATIC, PAYLOAD_STATIC, PAYLOAD_DYNAMIC, params=(COMMUNICATION_RECV, ))
+
+    def __init__(self, spi_id: int, sck: Pin, mosi: Pin, miso: Pin, csn: Pin, ce: Pin, telemetry=None, irq: Pin = None):
+        """
+        irq – вивід IRQ модуля: пакети обробляються за перериванням, а не опитуванням кожну мілісекунду
+        """
+        self._irq = irq
+        self._irq_pending = False
+        if irq is not None:
+            self._irq_trigger = Trigger()
+            self.delay_update = IRQ_POLL
+            self.update_triggers = (self._irq_trigger, )
         super().__init__()
+        if telemetry is not None:
+            self.telemetry = telemetry
 
         self._spi_id = spi_id
         self._sck = sck
@@ -29,18 +66,23 @@ class NRF24L01Communication(BasePart):
         self._miso = miso
         self._csn = csn
         self._ce = ce
-        self._buffer = bytearray(32)
+        self._input_radio = Input(INPUT_RADIO)
+        self._rx_buffers = [bytearray(PAYLOAD_MAX) for _ in range(RX_FIFO_DEPTH)]
+        self._rx_views = [memoryview(buffer) for buffer in self._rx_buffers]
+        self._rx_lengths = bytearray(RX_FIFO_DEPTH)
+        Startup(self._configure, thread=self.thread, owner=self, phase=PHASE_CALIBRATE)
 
     def _startup(self, controller: Controller):
-        send_pipe = b"\xa1" + self._pipe.get().to_bytes(4, 'big')
-        receive_pipe = b"\xb1" + self._pipe.get().to_bytes(4, 'big')
-
         self.nrf = RF24(
             spi=SPI(self._spi_id, sck=self._sck, mosi=self._mosi, miso=self._miso),
             csn=self._csn,
             ce_pin=self._ce,
             )
 
+    def _configure(self, controller: Controller):
+        send_pipe = b"\xa1" + self._pipe.get().to_bytes(4, 'big')
+        receive_pipe = b"\xb1" + self._pipe.get().to_bytes(4, 'big')
+
         self.nrf.ack = True
         self.nrf.pa_level = self._pa_level.get()
         self.nrf.data_rate = self._data_rate.get()
@@ -49,66 +91,103 @@ class NRF24L01Communication(BasePart):
         self.nrf.open_rx_pipe(1, receive_pipe)
 
         self.nrf.channel = self._channel.get()
-        self.nrf.dynamic_payloads = False
-        self.nrf.payload_length = 8
-
-        self.nrf.listen = True
-        self.nrf.load_ack(self._buffer[:self.nrf.payload_length], 1)
-
+        self._codec = PacketCodec(PAYLOAD_STATIC_LENGTH)
         vars_send = Var.get_vars([COMMUNICATION_ALLWAYS_SEND])
-        self.vars_send = {var.get_addr(): utime.ticks_ms() for var in vars_send}
+        self._telemetry = TelemetryScheduler(
+            [var.get_addr()[0] for var in vars_send],
+            {addr[0]: self.telemetry[addr] for addr in self.telemetry},
+        )
         self.vars_request = []
+        self._apply_payload_mode()
+
+        if self._irq is not None:
+            # Переривання тільки на прийом: TX_DS після кожного ACK тримав би IRQ у низькому рівні
+            self.nrf.interrupt_config(data_recv=True, data_sent=False, data_fail=False)
+            self._irq.init(Pin.IN, Pin.PULL_UP)
+            self._irq.irq(handler=self._irq_handler, trigger=Pin.IRQ_FALLING)
 
     def _update(self, controller: Controller):
-        if self.nrf.available():
-            package = self.nrf.read()
-            self._recv_update(package)
-            self._send_update()
-
-    def _recv_update(self, package):
-        s = 0
-        fmt = '<'
-        while s < self.nrf.payload_length:
-            addr = package[s].to_bytes(1, 'big')
-            if addr == b'\xcf':
-                fmt += f"bb"
-                s += 1
-            elif addr != b'\x00':
-                type_var = Var.addr_get_type_var(addr)
-                length = Var.addr_get_length_type_var(addr)
-                fmt += f"b{type_var}"
-                s += length
-            s += 1
-        values = struct.unpack(fmt, package)
-        for i in range(0, len(values), 2):
-            addr = values[i].to_bytes(1, 'big')
-            value = values[i+1]
-            if addr == b'\xcf':
-                if Var.addr_is_var(value.to_bytes(1, 'big')) and COMMUNICATION_REQUEST_SEND in Var.addr_get_params(value.to_bytes(1, 'big')):
-                    self.vars_request.append(value.to_bytes(1, 'big'))
-            elif Var.addr_is_var(addr) and COMMUNICATION_RECV in Var.addr_get_params(addr):
-                Var.addr_set(addr, value)
+        # Усі пакети, що чекають, розбираються по черзі, у змінні записується останнє значення кожної адреси
+        # і надсилається один ACK
+        codec = self._codec
+        count = 0
+        if get_mode() == MODE_REPLAY:
+            # Пакети приходять із запису, а не з радіомодуля
+            package = self._input_radio.take()
+            while package is not None:
+                codec.decode(package, self.vars_request)
+                count += 1
+                package = self._input_radio.take()
+        elif self._irq is None or self._irq_pending:
+            self._irq_pending = False
+            count = self.nrf.read_all(self._rx_buffers, self._rx_lengths)
+            recording = get_mode() == MODE_RECORD
+            for i in range(count):
+                if recording:
+                    self._input_radio.event(self._rx_views[i][:self._rx_lengths[i]])
+                codec.decode(self._rx_buffers[i], self.vars_request, self._rx_lengths[i])
+            if self._irq is not None and self.nrf.rx_more:
+                # Пакет прийшов після останньої перевірки FIFO
+                self._irq_pending = True
+                self._irq_trigger.fire()
+        elif self.nrf.available():
+            # Пропущений фронт IRQ
+            self._irq_pending = True
+            self._irq_trigger.fire()
+        if count:
+            self.rx_packets += count
+            if count > 1:
+                self.rx_backlog += 1
+            codec.apply()
+            if self._payload_mode.get() != self._mode:
+                # ACK завантажується вже у новому режимі: flush_tx викинув би підготовлений раніше
+                self._apply_payload_mode()
+            else:
+                self._send_update()
+            if self._mode == PAYLOAD_DYNAMIC:
+                self._last_packet = utime.ticks_ms()
+        elif self._mode == PAYLOAD_DYNAMIC and utime.ticks_diff(utime.ticks_ms(), self._last_packet) > PAYLOAD_FALLBACK:
+            # Передавач не підтримує динамічні пакети або зв'язок втрачено: повернення до 8 байт
+            logger.warning('No packets in dynamic payload mode, fallback to static')
+            self._payload_mode.set(PAYLOAD_STATIC)
+            self._apply_payload_mode()
+
+    def _irq_handler(self, pin):
+        self._irq_pending = True
+        self._irq_trigger.fire()
+
+    def _apply_payload_mode(self):
+        self._mode = self._payload_mode.get()
+        self.nrf.listen = False
+        if self._mode == PAYLOAD_DYNAMIC:
+            self.nrf.dynamic_payloads = True
+            self._codec.length = PAYLOAD_MAX
+        else:
+            self.nrf.dynamic_payloads = False
+            self.nrf.payload_length = PAYLOAD_STATIC_LENGTH
+            self._codec.length = PAYLOAD_STATIC_LENGTH
+        self._last_packet = utime.ticks_ms()
+        self.nrf.flush_tx()
+        self.nrf.listen = True
+        self._send_update()
 
     def _send_update(self):
-        items = list(self.vars_send.items())
-        for var in self.vars_request:
-            if var not in self.vars_send:
-                items.append((var, 0))
-        vars_send = sorted(items, key=lambda item: item[1])
-        payload_length = 0
-        fmt = '<'
-        send = []
-        for addr, time_update in vars_send:
-            new_payload_length = payload_length + Var.addr_get_length_type_var(addr) + 1
-            if new_payload_length <= self.nrf.payload_length:
-                fmt += f"b{Var.addr_get_type_var(addr)}"
-                send.append(int.from_bytes(addr, 'big'))
-                send.append(Var.addr_get(addr))
-                self.vars_send[addr] = utime.ticks_ms()
-                payload_length = new_payload_length
-            else:
-                break
-        self._buffer = struct.pack(fmt, *send)
-        self._buffer = self._buffer + (self.nrf.payload_length - len(self._buffer)) * b'\x00'
-        self.nrf.load_ack(self._buffer[:self.nrf.payload_length], 1)
-        self.vars_request = []
+        for slot in self.vars_request:
+            self._telemetry.request(slot)
+        self.vars_request.clear()
+        codec = self._codec
+        codec.pack_start()
+        self._telemetry.fill(codec)
+        self.nrf.load_ack(codec.pack_end(self._mode == PAYLOAD_DYNAMIC), 1)
+
+    def get_telemetry_stats(self):
+        return self._telemetry.get_stats()
+
+    def get_rx_stats(self):
+        return {
+            'packets': self.rx_packets,
+            'backlog': self.rx_backlog,
+            'stale': self._codec.stale,
+            'errors': self._codec.errors,
+            'rejected': self._codec.rejected,
+        }
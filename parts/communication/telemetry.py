@@ -0,0 +1,116 @@
+import heapq
+
+import utime
+
+
+# Частота за замовчуванням (Гц) для змінних без налаштувань: 0 – щоразу, коли є місце
+TELEMETRY_RATE = 0
+TELEMETRY_PRIORITY = 0
+# Кількість рівнів пріоритету (0 – найнижчий)
+PRIORITIES = 4
+# Після цього значення (мс) відлік часу зсувається, щоб не виходити за межі ticks_diff
+REBASE_PERIOD = 1 << 28
+
+
+class TelemetryScheduler:
+    """
+    Вибір змінних для ACK payload.
+    Кожна змінна має частоту (Гц) та пріоритет: змінна стає готовою до надсилання через 1/частота після
+    попереднього надсилання, готові змінні потрапляють у пакет від вищого пріоритету до нижчого,
+    у межах пріоритету – у порядку готовності. Змінні, які ще не готові, чекають у купі за часом готовності.
+    Запитані передавачем змінні (COMMUNICATION_REQUEST_SEND) надсилаються першими
+    """
+
+    def __init__(self, slots, rates=None):
+        """
+        slots – адреси (int) змінних, які надсилаються постійно
+        rates – {адреса (int): (частота Гц, пріоритет)}
+        """
+        if rates is None:
+            rates = {}
+        self._start = utime.ticks_ms()
+        self._periods = {}
+        self._priorities = {}
+        self.sent = {}
+        self.skipped = {}
+        # [час готовності (мс від _start), порядковий номер, адреса], один список на змінну
+        self._heap = []
+        self._entries = {}
+        self._ready = [[] for _ in range(PRIORITIES)]
+        self._requests = []
+        for i, slot in enumerate(slots):
+            rate, priority = rates.get(slot, (TELEMETRY_RATE, TELEMETRY_PRIORITY))
+            if not 0 <= priority < PRIORITIES:
+                raise ValueError(f'priority={priority} must be in range [0, {PRIORITIES - 1}]')
+            self._periods[slot] = 1000 // rate if rate else 0
+            self._priorities[slot] = priority
+            self.sent[slot] = 0
+            self.skipped[slot] = 0
+            self._entries[slot] = [0, i, slot]
+            self._ready[priority].append(slot)
+        self._counter = len(slots)
+
+    def request(self, slot):
+        if slot not in self._requests:
+            self._requests.append(slot)
+
+    def fill(self, codec):
+        """
+        Пакує в codec (PacketCodec між pack_start та pack_end) запитані та готові змінні
+        """
+        now = utime.ticks_diff(utime.ticks_ms(), self._start)
+        if now >= REBASE_PERIOD:
+            self._rebase(now)
+            now = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            self._ready[self._priorities[entry[2]]].append(entry[2])
+
+        requests = self._requests
+        while requests:
+            if not codec.pack(requests[0]):
+                return
+            requests.pop(0)
+
+        for priority in range(PRIORITIES - 1, -1, -1):
+            ready = self._ready[priority]
+            # Кожна змінна не більше одного разу за пакет: змінні з частотою 0 повертаються в кінець черги
+            for _ in range(len(ready)):
+                slot = ready[0]
+                if not codec.pack(slot):
+                    # Решта готових змінних чекає наступного пакета
+                    for i in range(priority, -1, -1):
+                        for slot in self._ready[i]:
+                            self.skipped[slot] += 1
+                    return
+                ready.pop(0)
+                self.sent[slot] += 1
+                period = self._periods[slot]
+                if period:
+                    entry = self._entries[slot]
+                    entry[0] = now + period
+                    self._counter = (self._counter + 1) & 0x3FFFFFFF
+                    entry[1] = self._counter
+                    heapq.heappush(heap, entry)
+                else:
+                    ready.append(slot)
+
+    def _rebase(self, now):
+        self._start = utime.ticks_add(self._start, now)
+        for entry in self._heap:
+            entry[0] -= now
+        heapq.heapify(self._heap)
+
+    def get_stats(self):
+        res = []
+        for slot in self.sent:
+            period = self._periods[slot]
+            res.append({
+                'addr': bytes((slot, )).hex(),
+                'rate': 1000 // period if period else 0,
+                'priority': self._priorities[slot],
+                'sent': self.sent[slot],
+                'skipped': self.skipped[slot],
+            })
+        return res